@@ -1,17 +1,120 @@
 # core/Logger.py
 
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from uuid import uuid4
+from pymongo import WriteConcern
 from termcolor import colored
 from core.MongoManager import MongoManager
-from core.config import IS_DEV
+from core.config import IS_DEV, LOG_DEBUG
+
+# DB log entries are buffered and written with insert_many once either limit is hit
+LOG_BUFFER_SIZE = 1000
+LOG_FLUSH_INTERVAL = 5.0  # seconds
+
+# Shared by every AppLogger so short-lived Shop/Product loggers don't each hold a buffer
+_buffer = []
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+_buffer_collection = None
+# Per-thread depth of open AppLogger.batch() blocks
+_batch_state = threading.local()
+# Background thread that writes entries left idle in the buffer (e.g. in the web process)
+_flusher = None
+
+
+def _flush_buffer():
+    global _last_flush
+
+    with _buffer_lock:
+        if not _buffer:
+            _last_flush = time.monotonic()
+            return
+        entries = _buffer[:]
+        _buffer.clear()
+        _last_flush = time.monotonic()
+        collection = _buffer_collection
+
+    try:
+        collection.insert_many(entries, ordered=False)
+    except Exception as e:
+        # Never let a logging failure replace the caller's own exception (e.g. from batch())
+        print(f"❌ Failed to write {len(entries)} log entries: {e}")
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        if _buffer and time.monotonic() - _last_flush >= LOG_FLUSH_INTERVAL:
+            _flush_buffer()
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_periodically, name="log-flusher", daemon=True)
+        _flusher.start()
+
+
+def _reset_after_fork():
+    global _flusher
+    # A forked child must not re-insert entries its parent already buffered, and
+    # does not inherit the parent's flusher thread
+    _buffer.clear()
+    _flusher = None
+
+
+atexit.register(_flush_buffer)
+os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 class AppLogger:
     def __init__(self, mongo: MongoManager = None):
         self.mongo = mongo or MongoManager()
 
+    @property
+    def logs(self):
+        # Logs don't need journaled durability, so skip waiting on the journal fsync
+        return self.mongo.logs.with_options(write_concern=WriteConcern(w=1, j=False))
+
+    def flush(self):
+        """
+        Writes any buffered log entries to MongoDB.
+        """
+        _flush_buffer()
+
+    @contextmanager
+    def batch(self):
+        """
+        Holds this thread's log entries in the buffer for the duration of the block (apart
+        from the LOG_BUFFER_SIZE cap and the background flush every LOG_FLUSH_INTERVAL) and
+        writes them with one insert_many when it exits, including on an exception. Wrap bulk
+        loops with it so their per-item logs, warnings and errors included, don't each trigger
+        a flush. Blocks may nest; the outermost one flushes.
+        """
+        _batch_state.depth = getattr(_batch_state, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            _batch_state.depth -= 1
+            if not _batch_state.depth:
+                _flush_buffer()
+
+    @staticmethod
+    def enabled_for(level: str) -> bool:
+        """
+        Lets callers skip building log data for levels that would be dropped anyway.
+        """
+        return level != "debug" or LOG_DEBUG
+
     def log(self, event: str, data: dict, store: str = None, level: str = "info", task_id: str = None):
+        if not self.enabled_for(level):
+            return
+
         should_log_to_db = (
             level in ["warning", "error"] or
             event.endswith("_started") or
@@ -27,7 +130,12 @@ class AppLogger:
                 "data": data,
                 "timestamp": datetime.utcnow()
             }
-            self.mongo.logs.insert_one(log_entry)
+            # Warnings and errors are written straight away unless a batch() is holding them
+            self._buffer_entry(
+                log_entry,
+                flush=event.endswith("_completed") or
+                (level in ("warning", "error") and not getattr(_batch_state, "depth", 0))
+            )
 
         should_print = (
             IS_DEV or
@@ -54,6 +162,22 @@ class AppLogger:
             label = colored(f"[{level.upper()}]", color)
             print(f"{icon} {label} {event} — {data}")
 
+    def _buffer_entry(self, log_entry: dict, flush: bool = False):
+        global _buffer_collection
+
+        with _buffer_lock:
+            _ensure_flusher()
+            _buffer_collection = self.logs
+            _buffer.append(log_entry)
+            should_flush = (
+                flush or
+                len(_buffer) >= LOG_BUFFER_SIZE or
+                (not getattr(_batch_state, "depth", 0) and time.monotonic() - _last_flush >= LOG_FLUSH_INTERVAL)
+            )
+
+        if should_flush:
+            _flush_buffer()
+
     def log_task_start(self, event: str, count: int = 0) -> str:
         task_id = str(uuid4())
         self.log(
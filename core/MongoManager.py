@@ -1,24 +1,93 @@
 # core/MongoManager.py
 
 from pymongo import MongoClient, ASCENDING, DESCENDING
-from core.config import MONGODB_URI, MONGODB_DB_NAME
+from core.config import (
+    MONGODB_URI, MONGODB_DB_NAME,
+    MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE, MONGODB_MAX_IDLE_TIME_MS, MONGODB_WAIT_QUEUE_TIMEOUT_MS
+)
 from core.encryption import encrypt_token, decrypt_token
+import os
+import threading
 import time
 
+# One MongoClient per process. MongoClient is thread-safe and pools its own
+# connections, but must not be shared across fork(), so clients are keyed by pid.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client() -> MongoClient:
+    pid = os.getpid()
+    client = _clients.get(pid)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(pid)
+            if client is None:
+                # Keep warm connections around so bursts of task writes don't pay for setup
+                client = MongoClient(
+                    MONGODB_URI,
+                    maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                    minPoolSize=MONGODB_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                )
+                _clients[pid] = client
+    return client
+
 
 class MongoManager:
+    """
+    Lightweight handle onto the process-wide client. Creating one does not open
+    a connection, so it is safe to instantiate at import time and in every Shop.
+    """
+
     def __init__(self):
-        self.client = MongoClient(MONGODB_URI)
-        self.db = self.client[MONGODB_DB_NAME]
+        self._pid = None
+        self._db = None
+        self._collections = {}
+        self._indexes_created = False
 
-        # Collections
-        self.shops = self.db["shops"]
-        self.logs = self.db["logs"]
-        self.products = self.db["products"]
-        self.barcode_lookup_cache = self.db["barcode_lookup_cache"]
-        self.openai_cache = self.db["openai_cache"]
+    @property
+    def client(self) -> MongoClient:
+        return get_client()
 
-        self._indexes_created = False
+    @property
+    def db(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            # First use, or we are in a forked child: rebind to this process's client
+            self._pid = pid
+            self._db = get_client()[MONGODB_DB_NAME]
+            self._collections = {}
+        return self._db
+
+    def _collection(self, name: str):
+        db = self.db
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = db[name]
+        return collection
+
+    # Collections
+    @property
+    def shops(self):
+        return self._collection("shops")
+
+    @property
+    def logs(self):
+        return self._collection("logs")
+
+    @property
+    def products(self):
+        return self._collection("products")
+
+    @property
+    def barcode_lookup_cache(self):
+        return self._collection("barcode_lookup_cache")
+
+    @property
+    def openai_cache(self):
+        return self._collection("openai_cache")
 
     def create_indexes(self):
         """
@@ -35,9 +104,11 @@ class MongoManager:
         # === Products Indexes ===
         self._safe_create_index(self.products, [("barcode", ASCENDING)], "barcode_index", unique=True)
         self._safe_create_index(self.products, [("suppliers.name", ASCENDING)], "suppliers_name_index")
+        self._safe_create_index(self.products, [("suppliers.name_lc", ASCENDING)], "suppliers_name_lc_index")
         self._safe_create_index(self.products, [("updated_at", DESCENDING)], "updated_at_index")
         self._safe_create_index(self.products, [("created_at", DESCENDING)], "created_at_index")
         self._safe_create_index(self.products, [("barcode_lookup_data.brand", ASCENDING)], "brand_index")
+        self._safe_create_index(self.products, [("brand_lc", ASCENDING)], "brand_lc_index")
         self._safe_create_index(self.products, [("barcode_lookup_status", ASCENDING)], "barcode_lookup_status_index")
         self._safe_create_index(self.products, [("images_status", ASCENDING)], "images_status_index")
         self._safe_create_index(self.products, [("ai_generate_status", ASCENDING)], "ai_generate_status_index")
@@ -67,6 +138,12 @@ class MongoManager:
             [("shops.shop.status", ASCENDING)],
             "product_shops_shop_status_index"
         )
+        # Serves the leading shops $elemMatch of the posting/update listing pipelines
+        self._safe_create_index(
+            self.products,
+            [("shops.status", ASCENDING), ("shops.error_count", ASCENDING)],
+            "product_shops_status_error_count_index"
+        )
         self._safe_create_index(
             self.products,
             [("shops.shop.shop", ASCENDING), ("shops.shop.status", ASCENDING)],
@@ -110,3 +187,80 @@ class MongoManager:
             collection.create_index(fields, name=name, **kwargs)
         except Exception as e:
             print(f"❌ Failed to create index {name} on {collection.name}: {e}")
+
+    def backfill_supplier_name_lc(self) -> int:
+        """
+        Adds `name_lc` to supplier entries written before it existed. Safe to re-run;
+        returns the number of products updated.
+        """
+        result = self.products.update_many(
+            {"suppliers": {"$elemMatch": {"name_lc": {"$exists": False}}}},
+            [{"$set": {"suppliers": {"$map": {
+                "input": "$suppliers",
+                "as": "s",
+                "in": {"$mergeObjects": ["$$s", {"name_lc": {"$toLower": {"$ifNull": ["$$s.name", ""]}}}]}
+            }}}}]
+        )
+        print(f"✅ Backfilled supplier name_lc on {result.modified_count} products.")
+        return result.modified_count
+
+    def backfill_brand_lc(self) -> int:
+        """
+        Sets the root `brand_lc` (lowercased brand, or manufacturer when the brand is
+        empty) on products looked up before it existed. Safe to re-run; returns the
+        number of products updated.
+        """
+        result = self.products.update_many(
+            {"barcode_lookup_data": {"$type": "object"}, "brand_lc": {"$exists": False}},
+            [{"$set": {"brand_lc": {"$toLower": {"$let": {
+                "vars": {"brand": {"$ifNull": ["$barcode_lookup_data.brand", ""]}},
+                "in": {"$cond": [
+                    {"$ne": ["$$brand", ""]},
+                    "$$brand",
+                    {"$ifNull": ["$barcode_lookup_data.manufacturer", ""]}
+                ]}
+            }}}}}]
+        )
+        print(f"✅ Backfilled brand_lc on {result.modified_count} products.")
+        return result.modified_count
+
+    def verify_barcode_index(self, barcode: str = None) -> bool:
+        """
+        Explains a barcode lookup and checks it is served by an index scan rather than a
+        COLLSCAN. Every Product method filters on barcode, so this is the index that matters.
+        """
+        if barcode is None:
+            sample = self.products.find_one({}, {"barcode": 1})
+            barcode = sample["barcode"] if sample else ""
+
+        return self._verify_indexed("Barcode lookups", self.products.find({"barcode": barcode}))
+
+    def verify_shop_listing_index(self) -> bool:
+        """
+        Explains the shops filter the listing pipelines start with (pending/error entries under
+        the retry limit) and checks it is served by an index scan rather than a COLLSCAN.
+        """
+        cursor = self.products.find({"shops": {"$elemMatch": {
+            "status": {"$in": ["create_pending", "create_error"]},
+            "error_count": {"$lt": 3}
+        }}})
+        return self._verify_indexed("Shop listing scans", cursor)
+
+    @staticmethod
+    def _verify_indexed(label: str, cursor) -> bool:
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+
+        stages = []
+        pending = [plan]
+        while pending:
+            stage = pending.pop()
+            stages.append(stage.get("stage", ""))
+            pending.extend(stage.get(key) for key in ("inputStage", "queryPlan") if stage.get(key))
+            pending.extend(stage.get("inputStages", []))
+
+        uses_index = any("IXSCAN" in stage for stage in stages)
+        if uses_index:
+            print(f"✅ {label} use an index ({' <- '.join(stages)}).")
+        else:
+            print(f"❌ {label} are not indexed ({' <- '.join(stages)}). Run create_indexes().")
+        return uses_index
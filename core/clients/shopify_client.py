@@ -1,24 +1,57 @@
 # core/clients/shopify_client.py
 
+import os
+import threading
 import time
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import mimetypes
 from typing import Dict, Any
 from urllib.parse import urlparse
 from io import BytesIO
 from requests_toolbelt import MultipartEncoder
 
-from core.config import SHOPIFY_API_KEY, SHOPIFY_API_SECRET, SHOPIFY_API_VERSION, APP_BASE_URL
+from core.config import (
+    SHOPIFY_API_KEY, SHOPIFY_API_SECRET, SHOPIFY_API_VERSION, APP_BASE_URL,
+    SHOPIFY_HTTP_POOL_SHOPS, SHOPIFY_HTTP_POOL_SIZE
+)
 from core.shopify_graphql.mutations import (
     PRODUCT_CREATE_MUTATION,
     PRODUCT_VARIANTS_BULK_UPDATE_MUTATION,
     COLLECTION_ADD_PRODUCTS_MUTATION,
-    COLLECTION_CREATE_MUTATION
+    PRODUCT_JOIN_COLLECTIONS_MUTATION,
+    COLLECTION_CREATE_MUTATION,
+    PRODUCT_CREATE_MEDIA_MUTATION
 )
 from core.shopify_graphql.queries import GET_COLLECTIONS_QUERY, GET_COLLECTIONS_QUERY_PAGINATED
 
 import shopify
 
+# One keep-alive session per process, so calls to the same shop reuse TCP/TLS connections
+# instead of handshaking per request. Keyed by pid because pooled sockets must not be
+# shared across fork().
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(pid)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=SHOPIFY_HTTP_POOL_SHOPS,
+                    pool_maxsize=SHOPIFY_HTTP_POOL_SIZE
+                )
+                session.mount("https://", adapter)
+                _sessions[pid] = session
+    return session
+
+
 class ShopifyGraphQLError(Exception):
     pass
 
@@ -70,9 +103,12 @@ class ShopifyClient:
         }
 
         try:
-            response = requests.request(method, url, headers=headers, json=json, params=params, timeout=timeout)
+            body = orjson.dumps(json) if json is not None else None
+            response = get_http_session().request(
+                method, url, headers=headers, data=body, params=params, timeout=timeout
+            )
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
 
         except requests.HTTPError as e:
             self.shop.log_action("❌ shopify_rest_http_error", "error", {
@@ -95,11 +131,14 @@ class ShopifyClient:
             raise
 
     def _post_graphql(self, query: str, variables: Dict[str, Any], task_id=None) -> Dict[str, Any]:
+        # Encoded once and resent as-is on retries
+        body = orjson.dumps({"query": query, "variables": variables})
+
         for attempt in range(5):
             try:
-                response = requests.post(
+                response = get_http_session().post(
                     self.endpoint,
-                    json={"query": query, "variables": variables},
+                    data=body,
                     headers=self.headers,
                     timeout=15
                 )
@@ -123,7 +162,7 @@ class ShopifyClient:
                 continue
 
             try:
-                json_data = response.json()
+                json_data = orjson.loads(response.content)
             except Exception as e:
                 self.shop.log_action(
                     event="❌ shopify_invalid_json",
@@ -146,21 +185,6 @@ class ShopifyClient:
 
         raise ShopifyGraphQLError("Too many retries – Shopify API")
 
-    def upload_image_rest(self, product_id: str, image_url: str, task_id=None) -> dict:
-        result = self.rest(
-            method="POST",
-            path=f"products/{product_id}/images.json",
-            json={"image": {"src": image_url}},
-            task_id=task_id
-        )
-        image = result.get("image", {})
-        self.shop.log_action("✅ shopify_rest_image_attached", "info", {
-            "product_id": product_id,
-            "image_url": image_url,
-            "response_id": image.get("id")
-        }, task_id=task_id)
-        return result
-
     def set_inventory_level_rest(self, inventory_item_id: str, location_id: str, quantity: int, task_id=None) -> dict:
         result = self.rest(
             method="POST",
@@ -250,6 +274,33 @@ class ShopifyClient:
 
         return product_info
 
+    def create_product_media(self, product_gid: str, image_urls: list[str], alt: str = None, task_id=None) -> dict:
+        """
+        Attaches all image URLs to the product in one productCreateMedia call, keeping their order.
+        Returns {"media": [...], "errors": [...]}; per-image failures come back in `errors`
+        (mediaUserErrors) instead of raising, so the rest of the images still attach.
+        """
+        media = [
+            {"originalSource": url, "mediaContentType": "IMAGE", **({"alt": alt} if alt else {})}
+            for url in image_urls
+        ]
+        data = self._post_graphql(
+            PRODUCT_CREATE_MEDIA_MUTATION, {"productId": product_gid, "media": media}, task_id=task_id
+        )
+
+        result = data["productCreateMedia"]
+        errors = result.get("mediaUserErrors", [])
+        created = result.get("media") or []
+
+        self.shop.log_action(
+            event="✅ shopify_product_media_created",
+            level="success" if not errors else "warning",
+            data={"product_gid": product_gid, "count": len(created), "errors": errors},
+            task_id=task_id
+        )
+
+        return {"media": created, "errors": errors}
+
     def update_variant_bulk(self, product_gid: str, variant_payload: dict, task_id=None) -> dict:
         variables = {
             "productId": product_gid,
@@ -546,6 +597,31 @@ class ShopifyClient:
         )
         return collection_info
 
+    def join_collections(self, product_gid: str, collection_gids: list[str], task_id=None) -> None:
+        """
+        Adds one product to several collections with a single productUpdate call.
+        """
+        variables = {"product": {"id": product_gid, "collectionsToJoin": collection_gids}}
+
+        data = self._post_graphql(PRODUCT_JOIN_COLLECTIONS_MUTATION, variables, task_id=task_id)
+        errors = data["productUpdate"].get("userErrors", [])
+
+        if errors:
+            self.shop.log_action(
+                event="❌ shopify_collection_add_failed",
+                level="error",
+                data={"errors": errors, "product_gid": product_gid},
+                task_id=task_id
+            )
+            raise ShopifyGraphQLError(errors)
+
+        self.shop.log_action(
+            event="✅ shopify_product_added_to_collections",
+            level="info",
+            data={"product_gid": product_gid, "collection_gids": collection_gids},
+            task_id=task_id
+        )
+
     def create_collection(self, title: str, task_id=None) -> dict:
         variables = {"input": {"title": title}}
 
@@ -7,13 +7,25 @@ load_dotenv()
 
 ENVIRONMENT = os.getenv("ENVIRONMENT", "production").lower()
 IS_DEV = ENVIRONMENT == "development"
+# Set LOG_DEBUG=false to drop debug-level logs before they are formatted
+LOG_DEBUG = os.getenv("LOG_DEBUG", "true").lower() == "true"
 
 SHOPIFY_API_KEY = os.getenv("SHOPIFY_API_KEY")
 SHOPIFY_API_SECRET = os.getenv("SHOPIFY_API_SECRET")
 SHOPIFY_API_VERSION = os.getenv("SHOPIFY_API_VERSION", "2025-01").strip()
+# Keep-alive pool for Shopify API calls: shops kept in the pool, and connections per shop
+SHOPIFY_HTTP_POOL_SHOPS = int(os.getenv("SHOPIFY_HTTP_POOL_SHOPS", 20))
+SHOPIFY_HTTP_POOL_SIZE = int(os.getenv("SHOPIFY_HTTP_POOL_SIZE", 10))
+# Products created/updated concurrently within one shop by the Shopify tasks; shops already
+# run in parallel and each has its own rate-limit bucket, so this is bounded per shop
+SHOPIFY_PER_SHOP_WORKERS = int(os.getenv("SHOPIFY_PER_SHOP_WORKERS", 2))
 
 MONGODB_URI = os.getenv("MONGODB_URI")
 MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", 200))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", 10))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 300_000))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 5_000))
 
 ENCRYPTION_SECRET = os.getenv("ENCRYPTION_SECRET")
 
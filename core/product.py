@@ -1,13 +1,18 @@
 # core/product.py
-from pycparser.ply.yacc import error_count
 
 from core.MongoManager import MongoManager
 from core.Logger import AppLogger
-from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from datetime import datetime, timezone
 from core.exceptions import ProductNotFoundError
 from core.shop import Shop
-from math import ceil, floor
-from core.clients.shopify_client import ShopifyClient, ShopifyGraphQLError
+from math import ceil, floor, inf
+from pymongo import ReturnDocument, UpdateOne, WriteConcern
+from pymongo.errors import AutoReconnect, BulkWriteError, PyMongoError
+import random
+import threading
 import time
 
 mongo = MongoManager()
@@ -15,44 +20,468 @@ logger = AppLogger(mongo)
 
 MAX_FAIL_COUNT = 3
 
+# Whole-number rounding per shop "round_to" setting; anything else (e.g. 'closest') uses round()
+PRICE_ROUNDING = {"up": ceil, "down": floor}
+
+# Cap (seconds) on the exponential wait between Shopify inventory retries
+INVENTORY_RETRY_MAX_DELAY = 16
+
+# Enrichment output can be regenerated from suppliers/APIs, so those writes skip the
+# journal wait. Pass write_concern=None to fall back to the client default.
+INGEST_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+
+def _now():
+    # Timezone-aware UTC; BSON stores it as the same Date utcnow() produced.
+    return datetime.now(timezone.utc)
+
+
+def supplier_entry(name: str, data, parsed) -> dict:
+    """
+    Builds a product's supplier entry. `name_lc` lets shop exclusions match
+    suppliers with a plain (indexable) $in instead of $toLower at query time.
+    """
+    return {"name": name, "name_lc": (name or "").lower(), "data": data, "parsed": parsed}
+
+
+# Fields update_product() can write, with the timestamp stamped alongside each (if any)
+UPDATE_FIELDS = (
+    ("barcode_lookup_data", None),
+    ("barcode_lookup_status", "barcode_lookup_at"),
+    ("ai_generated_data", None),
+    ("ai_generate_status", "ai_generate_at"),
+    ("image_urls", None),
+    ("images_status", "images_at"),
+    ("suppliers", None),
+)
+
+# Fixed parts of the metafields written by generate_shopify_payload();
+# only the value is filled in per product.
+METAFIELD_TEMPLATES = {
+    "seo_title": {"key": "title", "namespace": "seo", "type": "single_line_text_field"},
+    "seo_description": {"key": "description", "namespace": "seo", "type": "multi_line_text_field"},
+    "seo_keywords": {"key": "keywords", "namespace": "seo", "type": "single_line_text_field"},
+    "snippet": {"key": "snippet", "namespace": "seo", "type": "multi_line_text_field"},
+    "ingredients": {"key": "ingredients", "namespace": "nutrition", "type": "multi_line_text_field"},
+    "facts": {"key": "facts", "namespace": "nutrition", "type": "multi_line_text_field"},
+    "suggested_use": {"key": "suggested_use", "namespace": "usage", "type": "multi_line_text_field"},
+}
+
+# Projections for callers that only touch a few fields
+BARCODE_LOOKUP_FIELDS = {"barcode": 1, "barcode_lookup_status": 1}
+IMAGE_ENRICHMENT_FIELDS = {
+    "barcode": 1,
+    "images_status": 1,
+    "barcode_lookup_status": 1,
+    "barcode_lookup_data.images": 1,
+}
+SHOP_LISTING_FIELDS = {"barcode": 1, "shops": 1}
+SUPPLIER_SYNC_FIELDS = {"barcode": 1, "suppliers": 1}
+
+# Shop listing schema used by _upsert_shop_listing(): the fields every entry carries,
+# and per status the fields that must be supplied and how error_count changes.
+LISTING_GLOBAL_DEFAULTS = {
+    "supplier": None,
+    "cost": None,
+    "stock_level": None,
+    "margin_used": None,
+    "rounding_used": None,
+    "round_to": None,
+    "selling_price": None,
+    "sku": None,
+    "shopify_id": None,
+    "shopify_gid": None,
+    "shopify_url": None,
+    "shopify_variant_id": None,
+    "shopify_handle": None,
+    "shopify_inventory_item_id": None,
+    "error_count": 0,
+    "message": None,
+}
+
+LISTING_CONFIGS = {
+    "create_pending": {"required": [], "defaults": {}},
+    "create_processing": {"required": [], "defaults": {}},
+    "create_error": {"required": [], "defaults": {}, "increment_error_count": True},
+    "create_fail": {"required": [], "defaults": {}},
+    "created": {
+        "required": [
+            "shopify_id", "shopify_gid", "shopify_variant_id", "shopify_url", "shopify_handle",
+            "supplier", "cost", "stock_level", "selling_price", "sku",
+            "margin_used", "rounding_used", "round_to"
+        ],
+        "defaults": {},
+        "reset_error_count": True
+    },
+    "update_pending": {"required": [], "defaults": {}},
+    "update_processing": {"required": [], "defaults": {}},
+    "update_error": {"required": [], "defaults": {}, "increment_error_count": True},
+    "update_fail": {"required": [], "defaults": {}},
+    "updated": {
+        "required": [
+            "supplier", "cost", "stock_level", "selling_price", "sku",
+            "margin_used", "rounding_used", "round_to"
+        ],
+        "defaults": {},
+        "reset_error_count": True
+    },
+    "unmanaged": {"required": [], "defaults": {}},
+}
+
+# Keys allowed in a listing entry for each status
+LISTING_VALID_KEYS = {
+    status: frozenset(LISTING_GLOBAL_DEFAULTS)
+            | {"status", "shop", "created_at", "updated_at"}
+            | frozenset(config.get("required", ()))
+            | frozenset(config.get("defaults", {}))
+    for status, config in LISTING_CONFIGS.items()
+}
+
+# Listing statuses that stop a product being posted again, with the reason reported
+LISTING_BLOCKED_REASONS = {
+    "created": "❌ Product has already been created.",
+    "create_processing": "❌ Product is being processed.",
+    "create_fail": "❌ Product has been marked as fail and will not be re-attempted.",
+    "unmanaged": "❌ Product is unmanaged.",
+}
+
+# Projection used by Product.for_listing_check()
+LISTING_CHECK_FIELDS = {
+    "barcode": 1,
+    "barcode_lookup_status": 1,
+    "images_status": 1,
+    "ai_generate_status": 1,
+    "image_urls": 1,
+    "ai_generated_data.title": 1,
+    "ai_generated_data.description": 1,
+    "ai_generated_data.product_type": 1,
+    "barcode_lookup_data.brand": 1,
+    "barcode_lookup_data.manufacturer": 1,
+    "suppliers.name": 1,
+    "suppliers.parsed": 1,
+    "shops.shop": 1,
+    "shops.status": 1,
+}
+
+_active_writer = threading.local()
+
+
+def _products_collection(write_concern: WriteConcern = None):
+    products = mongo.db.products
+    return products.with_options(write_concern=write_concern) if write_concern else products
+
+# Process-local cache of full documents, so repeated full loads in one worker skip the
+# round-trip. Entries expire after PRODUCT_CACHE_TTL seconds and are dropped on every write
+# made through Product, but not on writes from other processes, so reads only use it when
+# the caller opts in with cached=True (read-mostly stages whose writes are guarded).
+PRODUCT_CACHE_SIZE = 10_000
+PRODUCT_CACHE_TTL = 60.0
+
+_product_cache = OrderedDict()  # barcode -> (expires_at, document)
+_product_cache_lock = threading.Lock()
+
+
+class ProductWriter:
+    """
+    Collects product updates and sends them with bulk_write instead of one
+    update_one per call. While a `with ProductWriter():` block is open, Product
+    writes made on the same thread are queued and flushed every `batch_size`
+    operations and on exit. `modified_count` totals the documents changed by the
+    batches sent so far, including the applied part of a batch that failed.
+    Batches use INGEST_WRITE_CONCERN unless a different `write_concern` is given,
+    or None for the client default.
+    """
+
+    def __init__(self, batch_size: int = 500, write_concern: WriteConcern = INGEST_WRITE_CONCERN):
+        self.batch_size = batch_size
+        self.write_concern = write_concern
+        self.ops = []
+        self.barcodes = set()
+        self.modified_count = 0
+        self._previous = None
+
+    @staticmethod
+    def active():
+        return getattr(_active_writer, "writer", None)
+
+    def queue(self, op, barcode: str = None):
+        """
+        Queues a write. Pass the product's `barcode` so its cached document is
+        dropped once the write has been sent.
+        """
+        self.ops.append(op)
+        if barcode is not None:
+            self.barcodes.add(barcode)
+        if len(self.ops) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.ops:
+            return None
+        ops, self.ops = self.ops, []
+        barcodes, self.barcodes = self.barcodes, set()
+        try:
+            # Ordered so repeated writes to the same product apply in call order
+            result = _products_collection(self.write_concern).bulk_write(ops, ordered=True)
+        except BulkWriteError as e:
+            self.modified_count += e.details.get("nModified", 0)
+            raise
+        finally:
+            # After the write, so a load made while the ops were queued can't stay cached
+            for barcode in barcodes:
+                Product.invalidate(barcode)
+        self.modified_count += result.modified_count
+        return result
+
+    def __enter__(self):
+        self._previous = ProductWriter.active()
+        _active_writer.writer = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active_writer.writer = self._previous
+        self.flush()
+        return False
+
+
+# Marks a memoized Product value that has not been computed yet, where None is a valid result
+_UNSET = object()
+
+
 class Product:
-    def __init__(self, barcode: str):
+    __slots__ = (
+        "barcode", "product",
+        "_best_supplier_cache", "_selling_price_cache", "_supplier_index", "_shop_index", "_brand",
+        "_fresh"
+    )
+
+    def __init__(self, barcode: str, fields: dict = None, cached: bool = False):
+        """
+        `fields` is passed to find_one as a projection. A projected product is a
+        partial document: it can read the projected fields and make $set writes
+        through update_product(), but must not be used by methods that rewrite
+        whole arrays (suppliers, shops) unless those arrays are projected.
+        `cached=True` lets a full load be served from the process-local cache; never
+        use it for products whose listings or statuses are written back.
+        """
         self.barcode = barcode
-        self.product = self.get_product()
+        self.product = self.get_product(fields, cached)
+        self._best_supplier_cache = {}
+        self._selling_price_cache = {}
+        self._supplier_index = None
+        self._shop_index = None
+        self._brand = _UNSET
+
+    @classmethod
+    def for_listing_check(cls, barcode: str) -> "Product":
+        """
+        Loads only the fields needed by is_ready_to_post_to_shopify(), skipping the
+        large supplier `data` blobs and the rest of the AI/barcode lookup payloads.
+        """
+        return cls(barcode, fields=LISTING_CHECK_FIELDS)
+
+    @classmethod
+    def from_document(cls, document: dict, fresh: bool = True) -> "Product":
+        """
+        Builds a Product around an already-fetched document, skipping the find_one in __init__.
+        Pass fresh=False for documents served from the cache (see update_product()).
+        """
+        product = cls.__new__(cls)
+        product.barcode = document["barcode"]
+        product.product = document
+        product._fresh = fresh
+        product._best_supplier_cache = {}
+        product._selling_price_cache = {}
+        product._supplier_index = None
+        product._shop_index = None
+        product._brand = _UNSET
+        return product
+
+    def copy(self) -> "Product":
+        """
+        Returns an independent Product over a deep copy of this document, for handing
+        the same product to another thread.
+        """
+        return Product.from_document(deepcopy(self.product), fresh=self._fresh)
+
+    @classmethod
+    def bulk_load(cls, barcodes, fields: dict = None, cached: bool = False) -> dict[str, "Product"]:
+        """
+        Loads many products with a single $in query.
+        Returns a dict of barcode -> Product; barcodes not in the database are omitted.
+        `fields` is an optional projection, with the same caveats as in __init__.
+        With cached=True (full loads only, same caveat as in __init__) cached products
+        are served from the document cache and only the misses are queried.
+        """
+        barcodes = list(barcodes)
+        if not barcodes:
+            return {}
+
+        if fields is not None:
+            return {
+                doc["barcode"]: cls.from_document(doc)
+                for doc in mongo.db.products.find({"barcode": {"$in": barcodes}}, fields)
+            }
+
+        loaded = {}
+        missing = []
+        for barcode in barcodes:
+            document = cls._cached_document(barcode) if cached else None
+            if document is not None:
+                loaded[barcode] = cls.from_document(document, fresh=False)
+            else:
+                missing.append(barcode)
+
+        if missing:
+            for doc in mongo.db.products.find({"barcode": {"$in": missing}}):
+                cls._cache_document(doc)
+                loaded[doc["barcode"]] = cls.from_document(doc)
+        return loaded
+
+    @staticmethod
+    def invalidate(barcode: str):
+        """
+        Drops a product from the process-local document cache. Call this after
+        writing to a product outside of the Product methods.
+        """
+        with _product_cache_lock:
+            _product_cache.pop(barcode, None)
+
+    @staticmethod
+    def clear_cache():
+        with _product_cache_lock:
+            _product_cache.clear()
+
+    @staticmethod
+    def _cached_document(barcode: str) -> dict | None:
+        with _product_cache_lock:
+            cached = _product_cache.get(barcode)
+            if cached is None:
+                return None
+            expires_at, document = cached
+            if expires_at < time.monotonic():
+                del _product_cache[barcode]
+                return None
+            _product_cache.move_to_end(barcode)
+        # Callers mutate self.product, so never hand out the cached dict itself
+        return deepcopy(document)
+
+    @staticmethod
+    def _cache_document(document: dict):
+        with _product_cache_lock:
+            _product_cache[document["barcode"]] = (time.monotonic() + PRODUCT_CACHE_TTL, deepcopy(document))
+            _product_cache.move_to_end(document["barcode"])
+            while len(_product_cache) > PRODUCT_CACHE_SIZE:
+                _product_cache.popitem(last=False)
+
+    def get_product(self, fields: dict = None, cached: bool = False):
+        # Only full documents are cached; projected reads always go to the database
+        if fields is None and cached:
+            document = self._cached_document(self.barcode)
+            if document is not None:
+                self._fresh = False
+                return document
 
-    def get_product(self):
         try:
-            product = mongo.db.products.find_one({"barcode": self.barcode})
-            if not product:
-                raise ProductNotFoundError(self.barcode)
-            return product
-        except Exception as e:
+            product = mongo.db.products.find_one({"barcode": self.barcode}, fields)
+        except AutoReconnect:
+            # Transient; leave it to the driver's retry handling
+            raise
+        except PyMongoError as e:
             self.log_action(
                 event="mongodb_error",
                 level="error",
-                data={"message": f"Error fetching product: {str(e)}"}
+                data={"message": "Error fetching product.", "error": e.__class__.__name__}
             )
             raise
 
+        if not product:
+            raise ProductNotFoundError(self.barcode)
+        self._fresh = True
+        if fields is None:
+            self._cache_document(product)
+        return product
+
+    def _write(self, update: dict, match: dict = None, array_filters: list = None,
+               write_concern: WriteConcern = None):
+        """
+        Applies an update to this product, or queues it on the active ProductWriter.
+        `match` adds extra conditions to the barcode filter. Queued writes use the
+        writer's write concern rather than `write_concern`.
+        Returns the UpdateResult, or None when the write was queued.
+        """
+        query = {"barcode": self.barcode, **(match or {})}
+        writer = ProductWriter.active()
+        if writer is not None:
+            writer.queue(UpdateOne(query, update, array_filters=array_filters), barcode=self.barcode)
+            return None
+        try:
+            return _products_collection(write_concern).update_one(query, update, array_filters=array_filters)
+        finally:
+            Product.invalidate(self.barcode)
+
+    def _write_supplier(self, supplier: dict, changes: dict):
+        """
+        Writes changed keys of one supplier entry in place, instead of re-sending the
+        whole suppliers array. `changes` maps a sub-document ("parsed", "data") to the
+        keys that changed in it. Keys that can't be used in a field path (empty, '.' or a
+        leading '$') fall back to writing that whole sub-document.
+        """
+        update = {}
+        for field, keys in changes.items():
+            if any(not key or "." in key or key.startswith("$") for key in keys):
+                update[f"suppliers.$[s].{field}"] = supplier.get(field)
+            else:
+                for key in keys:
+                    update[f"suppliers.$[s].{field}.{key}"] = supplier[field][key]
+
+        self._write(
+            {"$set": update, "$currentDate": {"updated_at": True}},
+            array_filters=[{"s.name": supplier["name"]}]
+        )
+
+    def _suppliers_index(self) -> dict:
+        """
+        Maps supplier name -> supplier entry in self.product["suppliers"], built on first use.
+        The on-disk layout stays a list; this is only a local lookup table.
+        """
+        if self._supplier_index is None:
+            index = {}
+            for supplier in self.product.get("suppliers") or ():
+                index.setdefault(supplier.get("name"), supplier)
+            self._supplier_index = index
+        return self._supplier_index
+
+    def _suppliers_changed(self):
+        # Drop everything derived from the local suppliers list
+        self._best_supplier_cache.clear()
+        self._supplier_index = None
+
+    def has_supplier(self, supplier_name: str) -> bool:
+        return supplier_name in self._suppliers_index()
+
     def add_supplier(self, supplier_name, supplier_data, supplier_parsed_data):
         if not self.product:
             raise ProductNotFoundError(self.barcode)
 
-        existing_suppliers = [s["name"] for s in self.product.get("suppliers", [])]
-        if supplier_name not in existing_suppliers:
-            self.product["suppliers"].append({
-                "name": supplier_name,
-                "data": supplier_data,
-                "parsed": supplier_parsed_data
-            })
+        entry = supplier_entry(supplier_name, supplier_data, supplier_parsed_data)
 
-            mongo.db.products.update_one(
-                {"barcode": self.barcode},
-                {"$set": {
-                    "suppliers": self.product["suppliers"],
-                    "updated_at": datetime.utcnow()
-                }}
-            )
+        # Push server-side only if the supplier isn't linked yet, so concurrent adds can't duplicate it
+        result = self._write(
+            {"$push": {"suppliers": entry}, "$currentDate": {"updated_at": True}},
+            match={"suppliers.name": {"$ne": supplier_name}}
+        )
+
+        linked_locally = self.has_supplier(supplier_name)
+        if result is not None:
+            added = result.modified_count > 0
+        else:
+            added = not linked_locally
+
+        if added:
+            if not linked_locally:
+                self.product.setdefault("suppliers", []).append(entry)
+            self._suppliers_changed()
 
             self.log_action(
                 event="supplier_added",
@@ -76,16 +505,21 @@ class Product:
         if not self.product:
             raise ProductNotFoundError(self.barcode)
 
-        suppliers = [s for s in self.product.get("suppliers", []) if s["name"] != supplier_name]
+        result = self._write(
+            {"$pull": {"suppliers": {"name": supplier_name}}, "$currentDate": {"updated_at": True}},
+            match={"suppliers.name": supplier_name}
+        )
 
-        if len(suppliers) != len(self.product["suppliers"]):
-            mongo.db.products.update_one(
-                {"barcode": self.barcode},
-                {"$set": {
-                    "suppliers": suppliers,
-                    "updated_at": datetime.utcnow()
-                }}
-            )
+        linked_locally = self.has_supplier(supplier_name)
+        if result is not None:
+            removed = result.modified_count > 0
+        else:
+            removed = linked_locally
+
+        if removed:
+            if linked_locally:
+                self.product["suppliers"] = [s for s in self.product["suppliers"] if s["name"] != supplier_name]
+            self._suppliers_changed()
 
             self.log_action(
                 event="supplier_removed",
@@ -107,40 +541,101 @@ class Product:
 
     def update_product(self, barcode_lookup_data=None, barcode_lookup_status=None,
                        ai_generated_data=None, ai_generate_status=None,
-                       image_urls=None, suppliers=None, images_status=None):
+                       image_urls=None, suppliers=None, images_status=None, refresh=False,
+                       write_concern: WriteConcern = INGEST_WRITE_CONCERN):
+        """
+        Applies the given fields with a single $set.
+
+        By default the local copy is updated from the same $set without re-reading.
+        Pass refresh=True to fetch the stored values of the changed fields back
+        in the same round trip via find_one_and_update.
+
+        Writes use INGEST_WRITE_CONCERN (w=1, no journal wait) unless a different
+        `write_concern` is given, or None for the client default.
+        """
         if not self.product:
             raise ProductNotFoundError(self.barcode)
 
+        if suppliers is not None:
+            suppliers = [{**s, "name_lc": (s.get("name") or "").lower()} for s in suppliers]
+
+        fields = {
+            "barcode_lookup_data": barcode_lookup_data,
+            "barcode_lookup_status": barcode_lookup_status,
+            "ai_generated_data": ai_generated_data,
+            "ai_generate_status": ai_generate_status,
+            "image_urls": image_urls,
+            "images_status": images_status,
+            "suppliers": suppliers,
+        }
+
+        # Drop values that match the local copy, but only when it was read from the database
+        # for this unit of work; a cached copy may be stale, so everything is written then.
+        # Fields missing locally (e.g. projected out) are always written.
+        product = self.product
+        fresh = self._fresh
+        now = _now()
         update_data = {}
+        for key, at_key in UPDATE_FIELDS:
+            value = fields[key]
+            if value is None or (fresh and key in product and product[key] == value):
+                continue
+            update_data[key] = value
+            if at_key:
+                update_data[at_key] = now
 
-        if barcode_lookup_data is not None:
-            update_data["barcode_lookup_data"] = barcode_lookup_data
-        if barcode_lookup_status is not None:
-            update_data["barcode_lookup_status"] = barcode_lookup_status
-            update_data["barcode_lookup_at"] = datetime.utcnow()
-        if ai_generated_data is not None:
-            update_data["ai_generated_data"] = ai_generated_data
-        if ai_generate_status is not None:
-            update_data["ai_generate_status"] = ai_generate_status
-            update_data["ai_generate_at"] = datetime.utcnow()
-        if image_urls is not None:
-            update_data["image_urls"] = image_urls
-        if images_status is not None:
-            update_data["images_status"] = images_status
-            update_data["images_at"] = datetime.utcnow()
-        if suppliers is not None:
-            update_data["suppliers"] = suppliers
+        if not update_data:
+            self.log_action(
+                event="product_no_changes",
+                level="debug",
+                data={"message": "No changes made to product."}
+            )
+            return
+
+        if "suppliers" in update_data:
+            self._suppliers_changed()
+        if "barcode_lookup_data" in update_data:
+            self._brand = _UNSET
+            # Denormalised for shop brand exclusions; same fallback as get_brand()
+            lookup = update_data["barcode_lookup_data"] or {}
+            update_data["brand_lc"] = str(lookup.get("brand") or lookup.get("manufacturer") or "").lower()
 
-        update_data["updated_at"] = datetime.utcnow()
+        update_data["updated_at"] = now
 
         try:
-            result = mongo.db.products.update_one(
-                {"barcode": self.barcode},
-                {"$set": update_data}
-            )
+            if refresh:
+                try:
+                    stored = _products_collection(write_concern).find_one_and_update(
+                        {"barcode": self.barcode},
+                        {"$set": update_data},
+                        projection={"_id": 0, **dict.fromkeys(update_data, 1)},
+                        return_document=ReturnDocument.AFTER
+                    )
+                finally:
+                    Product.invalidate(self.barcode)
+                if not stored:
+                    raise ProductNotFoundError(self.barcode)
 
-            if result.modified_count > 0:
-                self.product.update(update_data)
+                self.product.update(stored)
+                self.log_action(
+                    event="product_updated",
+                    level="success",
+                    data={"message": "✅ Product updated successfully."}
+                )
+                return
+
+            result = self._write({"$set": update_data}, write_concern=write_concern)
+
+            # Trust the $set rather than re-reading the document
+            self.product.update(update_data)
+
+            if result is None:
+                self.log_action(
+                    event="product_update_queued",
+                    level="debug",
+                    data={"message": "Product update queued for bulk write."}
+                )
+            elif result.modified_count > 0:
                 self.log_action(
                     event="product_updated",
                     level="success",
@@ -152,13 +647,15 @@ class Product:
                     level="debug",
                     data={"message": "No changes made to product."}
                 )
-        except Exception as e:
+        except AutoReconnect:
+            raise
+        except PyMongoError as e:
             self.log_action(
                 event="mongodb_error",
                 level="error",
-                data={"message": f"Database update failed: {str(e)}"}
+                data={"message": "Database update failed.", "error": e.__class__.__name__}
             )
-            raise Exception(f"Database operation failed: {str(e)}")
+            raise
 
     def is_enriched_for_listing(self):
         data = self.product
@@ -183,11 +680,11 @@ class Product:
         return is_valid
 
     def is_product_eligible(self, shop: Shop) -> bool:
-        if not all([
-            self.product.get("barcode_lookup_status") == "success",
-            self.product.get("images_status") == "success",
-            self.product.get("ai_generate_status") == "success",
-        ]):
+        p = self.product
+        # images_status is the most common blocker, so it is checked first.
+        if p.get("images_status") != "success" \
+                or p.get("barcode_lookup_status") != "success" \
+                or p.get("ai_generate_status") != "success":
             self.log_action(
                 event="product_not_eligible_enrichment_incomplete",
                 level="debug",
@@ -203,7 +700,7 @@ class Product:
             )
 
         brand = self.get_brand()
-        if brand.lower() in shop.get_excluded_brands():
+        if brand.lower() in shop.excluded_brands_lc:
             self.log_action(
                 event="product_not_eligible_excluded_brand",
                 level="debug",
@@ -211,13 +708,10 @@ class Product:
             )
             return False
 
-        for supplier in self.product.get("suppliers", []):
-            name = supplier.get("name")
-            parsed = supplier.get("parsed", {})
-            if name.lower() in shop.get_excluded_suppliers():
-                continue
-            if parsed.get("price", 0) > 0:
-                return True
+        # A best supplier exists exactly when some non-excluded supplier has a price, and
+        # the result is memoized for the pricing/stock calls that follow eligibility
+        if self.get_best_supplier_for_shop(shop, log_fallback=False) is not None:
+            return True
 
         self.log_action(
             event="product_not_eligible_no_valid_supplier",
@@ -227,47 +721,63 @@ class Product:
         return False
 
     def get_best_supplier_for_shop(self, shop: Shop, log_fallback = True):
-        excluded = set(shop.get_excluded_suppliers())
-        in_stock = []
-        out_of_stock = []
+        # Memoized per shop; cleared whenever this product's suppliers change
+        if shop.domain in self._best_supplier_cache:
+            best = self._best_supplier_cache[shop.domain]
+        else:
+            best = self._find_best_supplier(shop)
+            self._best_supplier_cache[shop.domain] = best
 
-        for supplier in self.product.get("suppliers", []):
-            name = supplier.get("name")
-            if name in excluded:
+        # Logged per call (not per computation) so read-only checks can stay quiet
+        if log_fallback and best and best.get("stock_level", 0) <= 0:
+            self.log_action(
+                event="best_supplier_fallback_zero_stock",
+                level="debug",
+                data={
+                    "supplier": best["supplier_name"],
+                    "price": best["price"],
+                    "stock_level": best.get("stock_level"),
+                    "sku": best.get("sku"),
+                    "message": "⚠️ Falling back to zero stock supplier for best price."
+                }
+            )
+        return best
+
+    def _find_best_supplier(self, shop: Shop):
+        excluded = shop.excluded_suppliers_lc
+
+        # Single pass tracking the cheapest in-stock and out-of-stock suppliers
+        best_in_stock = None
+        best_in_stock_price = inf
+        best_out_of_stock = None
+        best_out_of_stock_price = inf
+
+        for supplier in self.product.get("suppliers") or ():
+            if (supplier.get("name") or "").lower() in excluded:
                 continue
 
             parsed = supplier.get("parsed", {})
             price = parsed.get("price")
-            stock = parsed.get("stock_level", 0)
-
-            if price and price > 0:
-                enriched = {"supplier_name": name, **parsed}
-                if stock > 0:
-                    in_stock.append(enriched)
-                else:
-                    out_of_stock.append(enriched)
-
-        best = min(in_stock, key=lambda s: s["price"], default=None)
-        if not best:
-            best = min(out_of_stock, key=lambda s: s["price"], default=None)
-            if best:
-                if log_fallback:
-                    self.log_action(
-                        event="best_supplier_fallback_zero_stock",
-                        level="debug",
-                        data={
-                            "supplier": best["supplier_name"],
-                            "price": best["price"],
-                            "stock_level": best["stock_level"],
-                            "sku": best["sku"],
-                            "message": "⚠️ Falling back to zero stock supplier for best price."
-                        }
-                    )
 
-        return best
+            if not price or price <= 0:
+                continue
 
-    def get_selling_price_for_shop(self, shop: Shop):
-        best_supplier = self.get_best_supplier_for_shop(shop, False)
+            if parsed.get("stock_level", 0) > 0:
+                if price < best_in_stock_price:
+                    best_in_stock, best_in_stock_price = supplier, price
+            elif best_in_stock is None and price < best_out_of_stock_price:
+                # Zero-stock suppliers only matter until an in-stock one turns up
+                best_out_of_stock, best_out_of_stock_price = supplier, price
+
+        if best_in_stock:
+            return {"supplier_name": best_in_stock.get("name"), **best_in_stock.get("parsed", {})}
+        if best_out_of_stock:
+            return {"supplier_name": best_out_of_stock.get("name"), **best_out_of_stock.get("parsed", {})}
+        return None
+
+    def get_selling_price_for_shop(self, shop: Shop, best_supplier: dict = None):
+        if best_supplier is None:
+            best_supplier = self.get_best_supplier_for_shop(shop, False)
         if not best_supplier:
             self.log_action(
                 event="selling_price_not_found",
@@ -279,19 +789,18 @@ class Product:
         margin = shop.get_setting("profit_margin", 1.5)
         rounding = shop.get_setting("rounding", 0.99)
         round_to = shop.get_setting("round_to", 'closest')
+
+        # Pure function of the supplier price and the shop's pricing settings
+        cache_key = (shop.domain, best_supplier["price"], margin, rounding, round_to)
+        if cache_key in self._selling_price_cache:
+            return self._selling_price_cache[cache_key]
+
         base_price = best_supplier["price"] * margin
         # Round up to nearest integer, then adjust to end in specified decimal (e.g., .99)
         # Example: base_price 22.43, rounding 0.99 → 22 + 0.99 = 22.99
 
         if rounding:
-            match round_to:
-                case "up":
-                    rounded_price = ceil(base_price) + rounding - 1
-                case "down":
-                    rounded_price = floor(base_price) + rounding - 1
-                case _:
-                    # Default case, will also catch 'closest'
-                    rounded_price = round(base_price) + rounding - 1
+            rounded_price = PRICE_ROUNDING.get(round_to, round)(base_price) + rounding - 1
         else:
             rounded_price = round(base_price, 2)
 
@@ -309,14 +818,17 @@ class Product:
             }
         )
 
-        return round(rounded_price, 2)
+        selling_price = round(rounded_price, 2)
+        self._selling_price_cache[cache_key] = selling_price
+        return selling_price
 
-    def get_stock_level_for_shop(self, shop: Shop) -> int:
+    def get_stock_level_for_shop(self, shop: Shop, best_supplier: dict = None) -> int:
         """
         Determines the stock level for the best supplier for this product
         based on the shop's settings (exclusions, stock availability, etc.).
         """
-        best_supplier = self.get_best_supplier_for_shop(shop, False)
+        if best_supplier is None:
+            best_supplier = self.get_best_supplier_for_shop(shop, False)
 
         if not best_supplier:
             self.log_action(
@@ -338,12 +850,27 @@ class Product:
         )
         return stock_level
 
+    def _shop_listing_index(self) -> dict:
+        """
+        Maps shop domain -> position in self.product["shops"], built on first use.
+        Methods that change the local shops list keep it in sync or reset it to None.
+        """
+        if self._shop_index is None:
+            index = {}
+            for i, entry in enumerate(self.product.get("shops") or ()):
+                index.setdefault(entry.get("shop"), i)
+            self._shop_index = index
+        return self._shop_index
+
+    def get_shop_listing(self, shop: Shop) -> dict | None:
+        idx = self._shop_listing_index().get(shop.domain)
+        return None if idx is None else self.product["shops"][idx]
+
     def has_shop_listing(self, shop: Shop, statuses: tuple[str] = None) -> bool:
-        for entry in self.product.get("shops", []):
-            if entry.get("shop") == shop.domain:
-                if statuses is None or entry.get("status") in statuses:
-                    return True
-        return False
+        entry = self.get_shop_listing(shop)
+        if entry is None:
+            return False
+        return statuses is None or entry.get("status") in statuses
 
     def is_ready_to_post_to_shopify(self, shop: Shop) -> tuple[bool, str]:
         """
@@ -354,82 +881,32 @@ class Product:
             return False, "❌ Product is not enriched."
         if not self.is_product_eligible(shop):
             return False, "❌ Product is not eligible for this shop."
-        if self.has_shop_listing(shop, statuses=("created",)):
-            return False, "❌ Product has already been created."
-        if self.has_shop_listing(shop, statuses=("create_processing",)):
-            return False, "❌ Product is being processed."
-        if self.has_shop_listing(shop, statuses=("create_fail",)):
-            return False, "❌ Product has been marked as fail and will not be re-attempted."
-        if self.has_shop_listing(shop, statuses=("unmanaged",)):
-            return False, "❌ Product is unmanaged."
+        entry = self.get_shop_listing(shop)
+        blocked = entry and LISTING_BLOCKED_REASONS.get(entry.get("status"))
+        if blocked:
+            return False, blocked
         return True, "✅ Product is ready to be listed."
 
     def _upsert_shop_listing(self, shop: Shop, listing_data: dict):
-        from datetime import datetime
-        now = datetime.utcnow()
+        now = _now()
         status = listing_data.get("status")
         listing_data["shop"] = shop.domain
         listing_data["updated_at"] = now
 
-        GLOBAL_DEFAULTS = {
-            "supplier": None,
-            "cost": None,
-            "stock_level": None,
-            "margin_used": None,
-            "rounding_used": None,
-            "round_to": None,
-            "selling_price": None,
-            "sku": None,
-            "shopify_id": None,
-            "shopify_gid": None,
-            "shopify_url": None,
-            "shopify_variant_id": None,
-            "shopify_handle": None,
-            "error_count": 0,
-            "message": None,
-        }
-
-        LISTING_CONFIGS = {
-            "create_pending": {"required": [], "defaults": {}},
-            "create_processing": {"required": [], "defaults": {}},
-            "create_error": {"required": [], "defaults": {}, "increment_error_count": True},
-            "create_fail": {"required": [], "defaults": {}},
-            "created": {
-                "required": [
-                    "shopify_id", "shopify_gid", "shopify_variant_id", "shopify_url", "shopify_handle",
-                    "supplier", "cost", "stock_level", "selling_price", "sku",
-                    "margin_used", "rounding_used", "round_to"
-                ],
-                "defaults": {},
-                "reset_error_count": True
-            },
-            "update_pending": {"required": [], "defaults": {}},
-            "update_processing": {"required": [], "defaults": {}},
-            "update_error": {"required": [], "defaults": {}, "increment_error_count": True},
-            "update_fail": {"required": [], "defaults": {}},
-            "updated": {
-                "required": [
-                    "supplier", "cost", "stock_level", "selling_price", "sku",
-                    "margin_used", "rounding_used", "round_to"
-                ],
-                "defaults": {},
-                "reset_error_count": True
-            },
-            "unmanaged": {"required": [], "defaults": {}},
-        }
-
         if status not in LISTING_CONFIGS:
             raise ValueError(f"❌ Unknown shop listing status '{status}'.")
 
         config = LISTING_CONFIGS[status]
 
-        for field in config.get("required", []):
-            if field not in listing_data or listing_data[field] in (None, "__clear__"):
-                raise ValueError(f"❌ Missing required field '{field}' for status '{status}'.")
+        missing = [field for field in config.get("required", ()) if listing_data.get(field) in (None, "__clear__")]
+        if missing:
+            raise ValueError(f"❌ Missing required field '{missing[0]}' for status '{status}'.")
 
-        # Get current values
-        existing_entry = next((s for s in self.product.get("shops", []) if s["shop"] == shop.domain), None)
-        full_listing = existing_entry.copy() if existing_entry else GLOBAL_DEFAULTS.copy()
+        # Get current values, keeping the index so the local copy can be synced without rescanning
+        shops = self.product.setdefault("shops", [])
+        existing_idx = self._shop_listing_index().get(shop.domain)
+        existing_entry = shops[existing_idx] if existing_idx is not None else None
+        full_listing = existing_entry.copy() if existing_entry else LISTING_GLOBAL_DEFAULTS.copy()
 
         # Merge config defaults
         full_listing.update(config.get("defaults", {}))
@@ -458,53 +935,37 @@ class Product:
                     "message": f"🚨 Product reached {error_count_temp}/{MAX_FAIL_COUNT} max creation attempts, no more attempts will be made."
                 })
 
-        valid_keys = set(GLOBAL_DEFAULTS) | {"status", "shop", "created_at", "updated_at"}
-        valid_keys.update(config.get("required", []))
-        valid_keys.update(config.get("defaults", {}).keys())
-
-        unexpected = set(full_listing.keys()) - valid_keys
+        unexpected = full_listing.keys() - LISTING_VALID_KEYS[status]
         if unexpected:
             raise ValueError(f"❌ Unexpected fields in listing_data: {unexpected}")
 
-        if existing_entry:
-            result = mongo.db.products.update_one(
-                {"barcode": self.barcode},
-                {"$set": {"shops.$[elem]": full_listing}},
-                array_filters=[{"elem.shop": shop.domain}]
-            )
-            if result.modified_count == 0:
-                self.log_action(
-                    event="shop_listing_update_fallback_triggered",
-                    level="warning",
-                    data={"shop": shop.domain, "message": "⚠️ Fallback triggered while updating shop listing."}
-                )
-                mongo.db.products.update_one(
-                    {"barcode": self.barcode},
-                    {"$pull": {"shops": {"shop": shop.domain}}}
-                )
-                mongo.db.products.update_one(
-                    {"barcode": self.barcode},
-                    {"$push": {"shops": full_listing}}
-                )
+        # Replace this shop's entry in place, or append it if there is none, in a single
+        # pipeline update. Works whether or not our local copy has seen the entry, and
+        # can never leave duplicates or a briefly missing listing. Queued when a
+        # ProductWriter is active.
+        listing = {"$literal": full_listing}
+        self._write(
+            [{"$set": {"shops": {"$cond": [
+                {"$in": [shop.domain, {"$ifNull": ["$shops.shop", []]}]},
+                {"$map": {
+                    "input": "$shops",
+                    "in": {"$cond": [{"$eq": ["$$this.shop", shop.domain]}, listing, "$$this"]}
+                }},
+                {"$concatArrays": [{"$ifNull": ["$shops", []]}, [listing]]}
+            ]}}}]
+        )
+
+        if existing_idx is not None:
+            shops[existing_idx] = full_listing
         else:
-            mongo.db.products.update_one(
-                {"barcode": self.barcode},
-                {"$push": {"shops": full_listing}}
-            )
+            shops.append(full_listing)
+            self._shop_index[shop.domain] = len(shops) - 1
             self.log_action(
                 event="shop_listing_created",
                 level="info",
-                data={"shop": shop.domain,"status": status, "message": "✨ New listing entry created for shop."}
+                data={"shop": shop.domain, "status": status, "message": "✨ New listing entry created for shop."}
             )
 
-        self.product.setdefault("shops", [])
-        for i, entry in enumerate(self.product["shops"]):
-            if entry["shop"] == shop.domain:
-                self.product["shops"][i] = full_listing
-                break
-        else:
-            self.product["shops"].append(full_listing)
-
         return full_listing
 
     def mark_listed_to_shop(self, shop: Shop, listing_data: dict):
@@ -526,10 +987,11 @@ class Product:
         )
 
     def unlist_from_shop(self, shop: Shop):
-        mongo.db.products.update_one(
-            {"barcode": self.barcode},
-            {"$pull": {"shops": {"shop": shop.domain}}}
-        )
+        self._write({"$pull": {"shops": {"shop": shop.domain}}})
+        # Only rebuild the local list when it actually holds this shop's entry
+        if shop.domain in self._shop_listing_index():
+            self.product["shops"] = [s for s in self.product["shops"] if s.get("shop") != shop.domain]
+            self._shop_index = None
 
         self.log_action(
             event="product_unlisted",
@@ -538,8 +1000,11 @@ class Product:
         )
 
     def get_brand(self):
-        return self.product.get("barcode_lookup_data", {}).get("brand") or \
-               self.product.get("barcode_lookup_data", {}).get("manufacturer")
+        # Memoized; reset by update_product() when barcode_lookup_data changes
+        if self._brand is _UNSET:
+            lookup = self.product.get("barcode_lookup_data") or {}
+            self._brand = lookup.get("brand") or lookup.get("manufacturer")
+        return self._brand
 
     def get_image_urls(self):
         return self.product.get("image_urls") or []
@@ -562,17 +1027,21 @@ class Product:
         if description.startswith("<p>"): description = description[3:]
         if description.endswith("</p>"): description = description[:-4]
 
-        body_html = f"<p>{description}</p>"
+        body_parts = [f"<p>{description}</p>"]
         if suggested := ai.get("suggested_use"):
-            body_html += f"<h3>Suggested Use</h3><p>{suggested}</p>"
+            body_parts.append(f"<h3>Suggested Use</h3><p>{suggested}</p>")
+        ingredients_text = ""
         if ingredients := ai.get("ingredients"):
-            body_html += f"<h3>Ingredients</h3><p>{', '.join(filter(None, ingredients))}</p>"
+            ingredients_text = ", ".join([i for i in ingredients if i])
+            body_parts.append(f"<h3>Ingredients</h3><p>{ingredients_text}</p>")
         nutrition_lines = []
         if nutrition := ai.get("nutritional_facts"):
             nutrition_lines = [f"{n['type']}: {n['amount']}{n['unit']}"
                                for n in nutrition if n.get("type") and n.get("amount") and n.get("unit")]
-            body_html += "<h3>Nutritional Information</h3><ul>" + "".join(
-                [f"<li>{line}</li>" for line in nutrition_lines]) + "</ul>"
+            body_parts.append(
+                f"<h3>Nutritional Information</h3><ul>{''.join(f'<li>{line}</li>' for line in nutrition_lines)}</ul>"
+            )
+        body_html = "".join(body_parts)
 
         payload = {
             "published": published,
@@ -584,18 +1053,18 @@ class Product:
             "metafields": []
         }
 
-        def meta(key, ns, val, typ):
-            payload["metafields"].append({
-                "key": key, "namespace": ns, "value": val, "type": typ
-            })
+        metafields = payload["metafields"]
 
-        if ai.get("seo_title"): meta("title", "seo", ai["seo_title"], "single_line_text_field")
-        if ai.get("seo_description"): meta("description", "seo", ai["seo_description"], "multi_line_text_field")
-        if ai.get("seo_keywords"): meta("keywords", "seo", ", ".join(ai["seo_keywords"]), "single_line_text_field")
-        if ai.get("snippet"): meta("snippet", "seo", ai["snippet"], "multi_line_text_field")
-        if ingredients: meta("ingredients", "nutrition", ", ".join(ingredients), "multi_line_text_field")
-        if nutrition_lines: meta("facts", "nutrition", "\n".join(nutrition_lines), "multi_line_text_field")
-        if suggested: meta("suggested_use", "usage", suggested, "multi_line_text_field")
+        def meta(name, val):
+            metafields.append({**METAFIELD_TEMPLATES[name], "value": val})
+
+        if ai.get("seo_title"): meta("seo_title", ai["seo_title"])
+        if ai.get("seo_description"): meta("seo_description", ai["seo_description"])
+        if ai.get("seo_keywords"): meta("seo_keywords", ", ".join(ai["seo_keywords"]))
+        if ai.get("snippet"): meta("snippet", ai["snippet"])
+        if ingredients_text: meta("ingredients", ingredients_text)
+        if nutrition_lines: meta("facts", "\n".join(nutrition_lines))
+        if suggested: meta("suggested_use", suggested)
 
         self.log_action("shopify_payload_generated", "info", {
             "shop": shop.domain, "message": "✅ Shopify product payload generated"
@@ -612,7 +1081,7 @@ class Product:
             })
             return None
 
-        selling_price = self.get_selling_price_for_shop(shop)
+        selling_price = self.get_selling_price_for_shop(shop, best_supplier)
         if selling_price is None:
             return None
 
@@ -648,16 +1117,19 @@ class Product:
         })
 
         try:
-            product_id, product_gid, variant_gid, handle, url = self.create_base_product_on_shopify(shop, task_id)
+            product_id, product_gid, variant_gid, inventory_item_id, handle, url = \
+                self.create_base_product_on_shopify(shop, task_id)
+
+            # Resolve supplier and price once and hand them to every step below
+            best_supplier = self.get_best_supplier_for_shop(shop)
+            selling_price = self.get_selling_price_for_shop(shop, best_supplier)
 
-            self.update_shopify_variant(shop, product_gid, variant_gid, task_id)
-            self.set_shopify_inventory(shop, variant_gid, task_id)
+            self.update_variant_and_inventory(
+                shop, product_gid, variant_gid, task_id, best_supplier, selling_price, inventory_item_id
+            )
             # NOTE: Use this to force failure for testing
             # raise Exception("force_fail")
-            self.upload_product_images_to_shopify(shop, product_id, task_id)
-
-            best_supplier = self.get_best_supplier_for_shop(shop)
-            selling_price = self.get_selling_price_for_shop(shop)
+            self.upload_product_images_to_shopify(shop, product_gid, task_id)
 
             self.assign_product_collections(shop, product_id, product_gid, task_id)
 
@@ -668,6 +1140,7 @@ class Product:
                 "shopify_url": url,
                 "shopify_variant_id": variant_gid,
                 "shopify_handle": handle,
+                "shopify_inventory_item_id": inventory_item_id,
                 "supplier": best_supplier["supplier_name"],
                 "cost": best_supplier["price"],
                 "stock_level": best_supplier.get("stock_level", 0),
@@ -725,25 +1198,27 @@ class Product:
 
         try:
             # Validate existing listing
-            existing = next((s for s in self.product.get("shops", []) if s.get("shop") == shop.domain), None)
+            existing = self.get_shop_listing(shop)
             if not existing or not existing.get("shopify_gid") or not existing.get("shopify_variant_id"):
                 raise Exception("❌ Cannot update — Shopify IDs missing from shop entry.")
 
             product_gid = existing["shopify_gid"]
             variant_gid = existing["shopify_variant_id"]
 
-            # Update price + SKU
-            self.update_shopify_variant(shop, product_gid, variant_gid, task_id)
+            best_supplier = self.get_best_supplier_for_shop(shop)
+            selling_price = self.get_selling_price_for_shop(shop, best_supplier)
 
-            # Update stock level
-            self.set_shopify_inventory(shop, variant_gid, task_id)
+            # Update price + SKU and stock level; tracking was enabled when the listing was
+            # created (listings created before the inventory item was stored look it up once)
+            inventory_item_id = self.update_variant_and_inventory(
+                shop, product_gid, variant_gid, task_id, best_supplier, selling_price,
+                existing.get("shopify_inventory_item_id"), tracked=True
+            )
 
             # Update internal record
-            best_supplier = self.get_best_supplier_for_shop(shop)
-            selling_price = self.get_selling_price_for_shop(shop)
-
             self.mark_listed_to_shop(shop, {
                 "status": "updated",
+                "shopify_inventory_item_id": inventory_item_id,
                 "supplier": best_supplier["supplier_name"],
                 "cost": best_supplier["price"],
                 "stock_level": best_supplier.get("stock_level", 0),
@@ -793,17 +1268,48 @@ class Product:
             if not variants:
                 raise Exception("❌ No variants found even after fallback.")
             variant_gid = variants[0]["id"]
+            inventory_item_id = variants[0].get("inventory_item_id")
         else:
-            variant_gid = variant_edges[0]["node"]["id"]
+            variant = variant_edges[0]["node"]
+            variant_gid = variant["id"]
+            inventory_item_gid = (variant.get("inventoryItem") or {}).get("id")
+            inventory_item_id = shop.client.extract_legacy_id(inventory_item_gid) if inventory_item_gid else None
 
         handle = response.get("handle")
         url = f"https://{shop.domain}/products/{handle}" if handle else None
 
-        return product_id, product_gid, variant_gid, handle, url
+        return product_id, product_gid, variant_gid, inventory_item_id, handle, url
 
-    def update_shopify_variant(self, shop: Shop, product_gid: str, variant_gid: str, task_id=None):
-        best_supplier = self.get_best_supplier_for_shop(shop)
-        selling_price = self.get_selling_price_for_shop(shop)
+    def update_variant_and_inventory(self, shop: Shop, product_gid: str, variant_gid: str, task_id=None,
+                                     best_supplier: dict = None, selling_price: float = None,
+                                     inventory_item_id: str = None, tracked: bool = False):
+        """
+        Updates the variant's price/SKU and sets its stock level, returning the inventory
+        item id used. The variant update is what turns inventory tracking on, so the stock
+        level is only set after it. Pass tracked=True when the item is already tracked
+        (existing listings) to run both calls concurrently; the first failure is raised
+        once both have finished.
+        """
+        if not tracked:
+            self.update_shopify_variant(shop, product_gid, variant_gid, task_id, best_supplier, selling_price)
+            return self.set_shopify_inventory(shop, variant_gid, task_id, best_supplier, inventory_item_id)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            variant = executor.submit(
+                self.update_shopify_variant, shop, product_gid, variant_gid, task_id, best_supplier, selling_price
+            )
+            inventory = executor.submit(
+                self.set_shopify_inventory, shop, variant_gid, task_id, best_supplier, inventory_item_id
+            )
+        variant.result()
+        return inventory.result()
+
+    def update_shopify_variant(self, shop: Shop, product_gid: str, variant_gid: str, task_id=None,
+                               best_supplier: dict = None, selling_price: float = None):
+        if best_supplier is None:
+            best_supplier = self.get_best_supplier_for_shop(shop)
+        if selling_price is None:
+            selling_price = self.get_selling_price_for_shop(shop, best_supplier)
         sku = best_supplier['sku']
 
         shop.client.update_variant_bulk(product_gid, {
@@ -822,16 +1328,23 @@ class Product:
             "message": "✏️ Variant updated with SKU and price."
         }, task_id=task_id)
 
-    def set_shopify_inventory(self, shop: Shop, variant_gid: str, task_id=None):
-        best_supplier = self.get_best_supplier_for_shop(shop)
+    def set_shopify_inventory(self, shop: Shop, variant_gid: str, task_id=None, best_supplier: dict = None,
+                              inventory_item_id: str = None):
+        """
+        Sets the variant's stock level and returns the inventory item id used.
+        Pass the known inventory_item_id to skip looking it up from the variant.
+        """
+        if best_supplier is None:
+            best_supplier = self.get_best_supplier_for_shop(shop)
         stock = best_supplier.get("stock_level", 0)
         location_id = shop.get_primary_location_id()
 
-        variant_id = ShopifyClient.extract_legacy_id(variant_gid)
-        variant = shop.client.rest("GET", f"variants/{variant_id}.json").get("variant", {})
-        inventory_item_id = variant.get("inventory_item_id")
         if not inventory_item_id:
-            raise Exception("❌ Could not determine inventory_item_id from variant.")
+            variant_id = shop.client.extract_legacy_id(variant_gid)
+            variant = shop.client.rest("GET", f"variants/{variant_id}.json").get("variant", {})
+            inventory_item_id = variant.get("inventory_item_id")
+            if not inventory_item_id:
+                raise Exception("❌ Could not determine inventory_item_id from variant.")
 
         max_attempts = 3
         for attempt in range(1, max_attempts + 1):
@@ -854,93 +1367,96 @@ class Product:
                 }, task_id=task_id)
                 if attempt == max_attempts:
                     raise
-                time.sleep(2 ** attempt)
+                # Jitter keeps concurrent workers from retrying against the rate limit in lockstep
+                time.sleep(min(2 ** attempt, INVENTORY_RETRY_MAX_DELAY) + random.uniform(0, 0.25 * 2 ** attempt))
 
-    def upload_product_images_to_shopify(self, shop: Shop, product_id: str, task_id=None):
-        for url in self.product.get("image_urls", []) or []:
-            try:
-                shop.client.upload_image_rest(product_id, url, task_id=task_id)
-            except Exception as e:
-                self.log_action("shopify_image_upload_failed", "warning", {
-                    "original_url": url,
-                    "error": str(e),
-                    "message": "⚠️ Failed to upload product image via REST."
-                }, task_id=task_id)
+        return inventory_item_id
+
+    def upload_product_images_to_shopify(self, shop: Shop, product_gid: str, task_id=None):
+        image_urls = self.product.get("image_urls", []) or []
+        if not image_urls:
+            return
+
+        # One productCreateMedia call for every image; failures come back per image
+        try:
+            result = shop.client.create_product_media(
+                product_gid, image_urls, alt=self.product.get("ai_generated_data", {}).get("title"), task_id=task_id
+            )
+        except Exception as e:
+            self.log_action("shopify_image_upload_failed", "warning", {
+                "original_urls": image_urls,
+                "error": str(e),
+                "message": "⚠️ Failed to upload product images via GraphQL."
+            }, task_id=task_id)
+            return
+
+        for error in result["errors"]:
+            field = error.get("field") or []
+            # field looks like ["media", "<index>", "originalSource"]
+            index = int(field[1]) if len(field) > 1 and str(field[1]).isdigit() else None
+            self.log_action("shopify_image_upload_failed", "warning", {
+                "original_url": image_urls[index] if index is not None and index < len(image_urls) else None,
+                "error": error.get("message"),
+                "message": "⚠️ Failed to upload product image via GraphQL."
+            }, task_id=task_id)
 
     def assign_product_collections(self, shop: Shop, product_id: str, product_gid: str, task_id: str = None):
+        """
+        Resolves every AI-suggested collection from the shop's local cache, creating the
+        missing ones, then joins the product to all of them in one call.
+        """
         ai = self.product.get("ai_generated_data", {})
         primary = ai.get("primary_collection")
         secondary = ai.get("secondary_collections") or []
-        collection_names = list(set(filter(None, [primary] + secondary)))
+        collection_names = {name for name in (primary, *secondary) if name}
 
+        collection_gids = {}
         for name in collection_names:
-            success = shop.add_product_to_collection(
-                product_id=product_id,
-                product_gid=product_gid,
-                title=name,
-                task_id=task_id
-            )
+            # Resolved from the shop's local cache; only missing collections hit Shopify
+            try:
+                collection_gid, created = shop.get_or_create_collection(name, task_id=task_id)
+            except Exception as e:
+                self.log_action("collection_create_failed", "error", {
+                    "collection": name,
+                    "product_id": product_id,
+                    "product_gid": product_gid,
+                    "message": "❌ Failed to create collection.",
+                    "error": str(e)
+                }, task_id=task_id)
+                continue
 
-            if not success:
-                try:
-                    created = shop.client.create_collection(title=name, task_id=task_id)
-                    shop.add_local_collection(created)
-
-                    retry_success = shop.add_product_to_collection(
-                        product_id=product_id,
-                        product_gid=product_gid,
-                        title=name,
-                        task_id=task_id
-                    )
+            collection_gids[name] = collection_gid
+            if created:
+                self.log_action("collection_created", "info", {
+                    "collection": name,
+                    "collection_gid": collection_gid,
+                    "message": "🌱 Created collection."
+                }, task_id=task_id)
+
+        if not collection_gids:
+            return
 
-                    if retry_success:
-                        self.log_action("collection_created_and_added", "info", {
-                            "collection": name,
-                            "product_id": product_id,
-                            "product_gid": product_gid,
-                            "collection_id": created["id"],
-                            "collection_gid": created["gid"],
-                            "message": "🌱 Created collection and added product."
-                        }, task_id=task_id)
-                    else:
-                        self.log_action("collection_create_retry_failed", "warning", {
-                            "collection": name,
-                            "product_id": product_id,
-                            "product_gid": product_gid,
-                            "message": "❌ Created collection but failed to add product."
-                        }, task_id=task_id)
-
-                except Exception as e:
-                    self.log_action("collection_create_failed", "error", {
-                        "collection": name,
-                        "product_id": product_id,
-                        "product_gid": product_gid,
-                        "message": "❌ Failed to create collection.",
-                        "error": str(e)
-                    }, task_id=task_id)
+        try:
+            shop.client.join_collections(product_gid, list(collection_gids.values()), task_id=task_id)
+        except Exception as e:
+            self.log_action("collection_add_failed_exception", "error", {
+                "collections": list(collection_gids),
+                "product_id": product_id,
+                "product_gid": product_gid,
+                "message": "❌ Failed to add product to collections.",
+                "error": str(e)
+            }, task_id=task_id)
 
     def update_supplier_parsed_data(self, supplier_name: str, parsed_updates: dict):
         """
         Updates parsed supplier data for a given supplier in the product.
         """
-        updated = False
+        supplier = self._suppliers_index().get(supplier_name)
 
-        for supplier in self.product.get("suppliers", []):
-            if supplier["name"] == supplier_name:
-                supplier["parsed"].update(parsed_updates)
-                updated = True
-                break
-
-        if updated:
-            mongo.db.products.update_one(
-                {"barcode": self.barcode},
-                {
-                    "$set": {
-                        "suppliers": self.product["suppliers"],
-                        "updated_at": datetime.utcnow()
-                    }
-                }
-            )
+        if supplier is not None:
+            supplier["parsed"].update(parsed_updates)
+            self._write_supplier(supplier, {"parsed": parsed_updates})
+            self._suppliers_changed()
             self.log_action(
                 "supplier_parsed_updated",
                 "info",
@@ -968,11 +1484,9 @@ class Product:
         """
         changed_fields = {"parsed": {}, "data": {}}
         updated = False
+        supplier = self._suppliers_index().get(supplier_name)
 
-        for supplier in self.product.get("suppliers", []):
-            if supplier["name"] != supplier_name:
-                continue
-
+        if supplier is not None:
             # Check and compare parsed fields
             for key, new_value in new_parsed.items():
                 old_value = supplier.get("parsed", {}).get(key)
@@ -991,18 +1505,9 @@ class Product:
                         supplier["data"][key] = new_value
                         updated = True
 
-            break
-
         if updated:
-            mongo.db.products.update_one(
-                {"barcode": self.barcode},
-                {
-                    "$set": {
-                        "suppliers": self.product["suppliers"],
-                        "updated_at": datetime.utcnow()
-                    }
-                }
-            )
+            self._write_supplier(supplier, {field: keys for field, keys in changed_fields.items() if keys})
+            self._suppliers_changed()
             self.log_action(
                 event="supplier_entry_updated",
                 level="info",
@@ -1026,6 +1531,8 @@ class Product:
         return changed_fields
 
     def log_action(self, event: str, level: str = "info", data: dict = None, task_id: str = None):
+        if not logger.enabled_for(level):
+            return
         logger.log(
             event=event,
             store=None,
@@ -1,11 +1,31 @@
 # core/products.py
 
 from core.MongoManager import MongoManager
-from core.product import Product
+from core.product import Product, ProductWriter
 from core.shop import Shop
 from core.Logger import AppLogger
-from core.product import MAX_FAIL_COUNT
-from datetime import datetime, timedelta
+from core.product import MAX_FAIL_COUNT, supplier_entry
+from core.exceptions import ProductNotFoundError
+from datetime import datetime
+from itertools import islice
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Iterator
+
+# Pipeline entries turned into (Product, Shop) pairs per bulk product load
+LISTING_PAIR_BATCH_SIZE = 500
+
+# Fields bulk_update_products() accepts per update
+BULK_UPDATE_FIELDS = ("barcode_lookup_data", "ai_generated_data", "image_urls", "suppliers")
+
+# Documents fetched per round-trip when streaming a shop's eligible products
+SHOP_PRODUCTS_BATCH_SIZE = 500
+
+# Fields the shop listing code reads from an eligible product
+SHOP_PRODUCT_FIELDS = (
+    "barcode", "suppliers", "ai_generated_data", "image_urls",
+    "barcode_lookup_data.brand", "barcode_lookup_data.manufacturer"
+)
 
 class Products:
     def __init__(self):
@@ -22,21 +42,8 @@ class Products:
         )
 
     def add_new_product(self, barcode, supplier_data):
-        existing_product = self.collection.find_one({"barcode": barcode})
-
-        if existing_product:
-            self.log_action(
-                event="product_exists",
-                level="debug",
-                data={
-                    "barcode": barcode,
-                    "message": f"🔁 Product already exists in database."
-                }
-            )
-            return Product(barcode)
-
-        product_data = {
-            "barcode": barcode,
+        now = datetime.utcnow()
+        new_fields = {
             "barcode_lookup_data": None,
             "barcode_lookup_status": "pending",
             "ai_generated_data": None,
@@ -44,18 +51,31 @@ class Products:
             "image_urls": None,
             "images_status": "pending",
             "suppliers": [
-                {
-                    "name": supplier_data["name"],
-                    "data": supplier_data["data"],
-                    "parsed": supplier_data["parsed"]
-                }
+                supplier_entry(supplier_data["name"], supplier_data["data"], supplier_data["parsed"])
             ],
             "shops": [],
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "created_at": now,
+            "updated_at": now
         }
 
-        self.collection.insert_one(product_data)
+        # Check-and-insert in one round trip: returns the existing document, or None if we inserted
+        existing_product = self.collection.find_one_and_update(
+            {"barcode": barcode},
+            {"$setOnInsert": new_fields},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if existing_product:
+            self.log_action(
+                event="product_exists",
+                level="debug",
+                data={
+                    "barcode": barcode,
+                    "message": f"🔁 Product already exists in database."
+                }
+            )
+            return Product.from_document(existing_product)
 
         self.log_action(
             event="product_added",
@@ -67,50 +87,61 @@ class Products:
             }
         )
 
-        return Product(barcode)
+        return Product.from_document({"barcode": barcode, **new_fields})
 
     def bulk_update_products(self, product_updates):
-        for product_update in product_updates:
-            barcode = product_update['barcode']
-            product_obj = Product(barcode)
-
-            product_obj.update_product(
-                barcode_lookup_data=product_update.get("barcode_lookup_data"),
-                ai_generated_data=product_update.get("ai_generated_data"),
-                image_urls=product_update.get("image_urls"),
-                suppliers=product_update.get("suppliers")
-            )
+        # Only the fields being written are needed locally, to skip values that are unchanged
+        fields = {"barcode": 1}
+        for key in BULK_UPDATE_FIELDS:
+            if any(u.get(key) is not None for u in product_updates):
+                fields[key] = 1
+        loaded = Product.bulk_load((u['barcode'] for u in product_updates), fields=fields)
+
+        with self.logger.batch(), ProductWriter():
+            for product_update in product_updates:
+                barcode = product_update['barcode']
+                product_obj = loaded.get(barcode)
+                if product_obj is None:
+                    raise ProductNotFoundError(barcode)
+
+                product_obj.update_product(**{key: product_update.get(key) for key in BULK_UPDATE_FIELDS})
 
-            self.log_action(
-                event="product_bulk_updated",
-                level="info",
-                data={
-                    "barcode": barcode,
-                    "message": "🔄 Product updated via bulk operation."
-                }
-            )
+        self.log_action(
+            event="product_bulk_updated",
+            level="info",
+            data={
+                "barcodes": [u['barcode'] for u in product_updates],
+                "message": f"🔄 {len(product_updates)} products updated via bulk operation."
+            }
+        )
 
     def prune_supplier_links_bulk(self, supplier_name, barcodes):
+        barcodes = list(barcodes)
+        if not barcodes:
+            return
+
+        # One $pull across every barcode instead of a write per product
+        result = self.collection.update_many(
+            {"barcode": {"$in": barcodes}, "suppliers.name": supplier_name},
+            {"$pull": {"suppliers": {"name": supplier_name}}, "$currentDate": {"updated_at": True}}
+        )
         for barcode in barcodes:
-            product_obj = Product(barcode)
-            product_obj.prune_supplier_link(supplier_name)
+            Product.invalidate(barcode)
 
-            self.log_action(
-                event="supplier_pruned_bulk",
-                level="info",
-                data={
-                    "barcode": barcode,
-                    "supplier": supplier_name,
-                    "message": f"🧹 Supplier link pruned from product."
-                }
-            )
+        self.log_action(
+            event="supplier_pruned_bulk",
+            level="info",
+            data={
+                "barcodes": barcodes,
+                "supplier": supplier_name,
+                "pruned": result.modified_count,
+                "message": f"🧹 Supplier link pruned from {result.modified_count} of {len(barcodes)} products."
+            }
+        )
 
     def bulk_add_supplier(self, supplier_name: str, barcode_data_list: list):
-        updated = 0
-        skipped = 0
-        failed = 0
-        updated_barcodes = []
-
+        ops = []
+        barcodes = []
         for item in barcode_data_list:
             barcode = item.get("barcode")
             if not barcode:
@@ -119,46 +150,38 @@ class Products:
                     level="warning",
                     data={"message": "⚠️ Skipping item with missing barcode.", "item": item}
                 )
-                failed += 1
                 continue
 
-            try:
-                product = Product(barcode)
-                existing_suppliers = [s["name"] for s in product.product.get("suppliers", [])]
-
-                if supplier_name in existing_suppliers:
-                    self.log_action(
-                        event="supplier_already_exists_bulk",
-                        level="debug",
-                        data={
-                            "barcode": barcode,
-                            "supplier": supplier_name,
-                            "message": f"Supplier already linked to product."
-                        }
-                    )
-                    skipped += 1
-                    continue
-
-                product.add_supplier(
-                    supplier_name=supplier_name,
-                    supplier_data=item["data"],
-                    supplier_parsed_data=item["parsed"]
-                )
-                updated += 1
-                updated_barcodes.append(barcode)
+            entry = supplier_entry(supplier_name, item["data"], item["parsed"])
+            # Same guard as Product.add_supplier: products already linked (or missing) don't match
+            ops.append(UpdateOne(
+                {"barcode": barcode, "suppliers.name": {"$ne": supplier_name}},
+                {"$push": {"suppliers": entry}, "$currentDate": {"updated_at": True}}
+            ))
+            barcodes.append(barcode)
 
-            except Exception as e:
+        updated = 0
+        errored = 0
+        if ops:
+            try:
+                updated = self.collection.bulk_write(ops, ordered=False).modified_count
+            except BulkWriteError as e:
+                updated = e.details.get("nModified", 0)
+                errored = len(e.details.get("writeErrors", []))
                 self.log_action(
                     event="bulk_add_supplier_error",
                     level="error",
                     data={
-                        "barcode": barcode,
                         "supplier": supplier_name,
-                        "message": f"❌ Failed to add supplier to product.",
-                        "error": str(e)
+                        "message": "❌ Failed to add supplier to some products.",
+                        "error": str(e.details.get("writeErrors", []))
                     }
                 )
-                failed += 1
+            for barcode in barcodes:
+                Product.invalidate(barcode)
+
+        skipped = len(ops) - updated - errored
+        failed = len(barcode_data_list) - len(ops) + errored
 
         self.log_action(
             event="bulk_add_supplier_summary",
@@ -175,127 +198,173 @@ class Products:
         return {
             "updated": updated,
             "skipped": skipped,
-            "failed": failed,
-            "updated_barcodes": updated_barcodes
+            "failed": failed
         }
 
-    def get_products_for_shop(self, shop: Shop):
+    def iter_products_for_shop(self, shop: Shop, fields=SHOP_PRODUCT_FIELDS) -> Iterator[dict]:
         """
-        Returns a list of products that are eligible for the given shop.
-        Excludes products that match shop's excluded suppliers or brands.
+        Streams the products that are eligible for the given shop, projected to `fields`
+        (pass None for whole documents). Excludes products that match the shop's excluded
+        suppliers or brands.
         """
-        eligible_products = []
-
-        excluded_suppliers = set(shop.get_excluded_suppliers())
-        excluded_brands = set(shop.get_excluded_brands())
-
-        products = self.collection.find()
-
-        for p in products:
-            suppliers = {s.get("name") for s in p.get("suppliers", [])}
-            brand = p.get("barcode_lookup_data", {}).get("brand") or \
-                    p.get("barcode_lookup_data", {}).get("manufacturer")
-
-            if suppliers & excluded_suppliers:
-                continue  # skip if any supplier is excluded
-
-            if brand and brand in excluded_brands:
-                continue  # skip if brand is excluded
+        projection = {"_id": 0, **dict.fromkeys(fields, 1)} if fields is not None else None
+        cursor = self.collection.find(
+            self._shop_products_query(shop), projection, batch_size=SHOP_PRODUCTS_BATCH_SIZE
+        )
 
-            eligible_products.append(p)
+        count = 0
+        for product in cursor:
+            count += 1
+            yield product
 
         self.log_action(
             event="eligible_products_fetched",
             level="debug",
             data={
                 "shop": shop.domain,
-                "count": len(eligible_products),
-                "message": f"🎯 {len(eligible_products)} products eligible for shop."
+                "count": count,
+                "message": f"🎯 {count} products eligible for shop."
             }
         )
 
-        return eligible_products
+    def get_products_for_shop(self, shop: Shop, fields=None) -> list[dict]:
+        """
+        Returns a list of products that are eligible for the given shop.
+        Prefer iter_products_for_shop() for large shops.
+        """
+        return list(self.iter_products_for_shop(shop, fields=fields))
 
-    def get_products_ready_for_posting(self) -> list[tuple[Product, Shop]]:
+    def count_products_for_shop(self, shop: Shop) -> int:
         """
-        Uses an aggregation pipeline to find product-shop pairs that are:
-        - status 'create_pending'
-        - OR 'create_error' with backoff period elapsed
-        Skips entries where error_count >= MAX_FAIL_COUNT
-        Returns list of (Product, Shop) tuples
+        Counts the products that are eligible for the given shop without fetching them.
         """
-        now = datetime.utcnow()
+        return self.collection.count_documents(self._shop_products_query(shop))
+
+    @staticmethod
+    def _shop_products_query(shop: Shop) -> dict:
+        # Filter server-side so excluded products never leave the database
+        exclusion_filters = shop.exclusion_filters()
+        return {"$and": exclusion_filters} if exclusion_filters else {}
 
-        pipeline = [
+    def _load_shops(self, domains) -> dict[str, Shop]:
+        """
+        Loads the given shops with a single $in query. Returns a dict of domain -> Shop;
+        domains without a shop document are omitted.
+        """
+        domains = list(domains)
+        if not domains:
+            return {}
+        return {doc["shop"]: Shop.from_document(doc) for doc in self.mongo.shops.find({"shop": {"$in": domains}})}
+
+    @staticmethod
+    def _shop_listing_pipeline(pending_status: str, error_status: str, max_errors: int, backoff_ms: int) -> list:
+        """
+        Builds the pipeline that returns {barcode, shop_domain} for shop listings that are
+        `pending_status`, or `error_status` with their backoff elapsed. The backoff is
+        backoff_ms * 2^(error_count - 1) after the listing's updated_at, and is checked
+        server-side so entries still backing off are never sent back.
+        """
+        return [
+            {"$match": {"shops": {"$elemMatch": {
+                "status": {"$in": [pending_status, error_status]},
+                "error_count": {"$lt": max_errors}
+            }}}},
             {"$unwind": "$shops"},
             {"$match": {
-                "shops.status": {"$in": ["create_pending", "create_error"]},
-                "shops.error_count": {"$lt": MAX_FAIL_COUNT}
-            }},
-            {"$addFields": {
-                "shop_status": "$shops.status",
-                "shop_error_count": "$shops.error_count",
-                "shop_updated_at": "$shops.updated_at",
-                "shop_domain": "$shops.shop",
-                "barcode": "$barcode"
+                "shops.status": {"$in": [pending_status, error_status]},
+                "shops.error_count": {"$lt": max_errors},
+                "$expr": {"$or": [
+                    {"$eq": ["$shops.status", pending_status]},  # always eligible
+                    {"$and": [
+                        # can't retry without a timestamp
+                        {"$eq": [{"$type": "$shops.updated_at"}, "date"]},
+                        {"$lte": [
+                            {"$add": [
+                                "$shops.updated_at",
+                                {"$multiply": [backoff_ms, {"$pow": [2, {"$subtract": ["$shops.error_count", 1]}]}]}
+                            ]},
+                            "$$NOW"
+                        ]}
+                    ]}
+                ]}
             }},
-            {"$project": {
-                "_id": 0,
-                "barcode": 1,
-                "shop_domain": 1,
-                "shop_status": 1,
-                "shop_error_count": 1,
-                "shop_updated_at": 1
-            }}
+            {"$project": {"_id": 0, "barcode": 1, "shop_domain": "$shops.shop"}}
         ]
 
-        raw_entries = list(self.collection.aggregate(pipeline))
-        eligible_pairs = []
-
-        for entry in raw_entries:
-            status = entry["shop_status"]
-            error_count = entry["shop_error_count"]
-            updated_at = entry.get("shop_updated_at")
-
-            if status == "create_pending":
-                pass  # always eligible
-            elif status == "create_error":
-                if not updated_at:
-                    continue  # can't retry without a timestamp
+    def _iter_listing_pairs(self, pipeline: list, failed_event: str, failed_message: str) -> Iterator[tuple[Product, Shop]]:
+        """
+        Streams the pipeline's {barcode, shop_domain} entries and yields (Product, Shop) pairs,
+        loading products with one $in query per LISTING_PAIR_BATCH_SIZE entries.
+        """
+        cursor = self.collection.aggregate(pipeline, batchSize=LISTING_PAIR_BATCH_SIZE)
+        shops = {}
+
+        while batch := list(islice(cursor, LISTING_PAIR_BATCH_SIZE)):
+            products = Product.bulk_load({entry["barcode"] for entry in batch})
+            new_domains = {entry["shop_domain"] for entry in batch} - shops.keys()
+            if new_domains:
+                shops.update(self._load_shops(new_domains))
+
+            claimed = set()
+            for entry in batch:
+                try:
+                    product = products.get(entry["barcode"])
+                    if product is None:
+                        raise ProductNotFoundError(entry["barcode"])
+                    # Pairs are handed to per-shop worker threads, so a barcode pending for
+                    # several shops gets its own Product (and document) per pair
+                    if entry["barcode"] in claimed:
+                        product = product.copy()
+                    claimed.add(entry["barcode"])
+                    # One Shop per domain, shared by all of its pairs
+                    shop = shops.get(entry["shop_domain"])
+                    if shop is None:
+                        raise ValueError(f"Shop '{entry['shop_domain']}' does not exist.")
+                except Exception as e:
+                    self.log_action(
+                        event=failed_event,
+                        level="warning",
+                        data={
+                            "barcode": entry["barcode"],
+                            "shop_domain": entry["shop_domain"],
+                            "error": str(e),
+                            "message": failed_message
+                        }
+                    )
+                    continue
 
-                # Dynamic exponential backoff: 6 * 2^(n-1)
-                wait_hours = 6 * (2 ** (error_count - 1))
-                retry_time = updated_at + timedelta(hours=wait_hours)
+                yield product, shop
 
-                if retry_time > now:
-                    continue  # backoff still active
+    def get_products_ready_for_posting(self) -> list[tuple[Product, Shop]]:
+        """
+        Uses an aggregation pipeline to find product-shop pairs that are:
+        - status 'create_pending'
+        - OR 'create_error' with backoff period elapsed
+        Skips entries where error_count >= MAX_FAIL_COUNT
+        Returns a list of (Product, Shop) tuples
+        """
+        # Dynamic exponential backoff: 6 * 2^(n-1) hours
+        pipeline = self._shop_listing_pipeline(
+            "create_pending", "create_error", MAX_FAIL_COUNT, backoff_ms=6 * 60 * 60 * 1000
+        )
 
-            try:
-                product = Product(entry["barcode"])
-                shop = Shop(entry["shop_domain"])
-                eligible_pairs.append((product, shop))
-            except Exception as e:
-                self.log_action(
-                    event="product_shop_instantiate_failed",
-                    level="warning",
-                    data={
-                        "barcode": entry["barcode"],
-                        "shop_domain": entry["shop_domain"],
-                        "error": str(e),
-                        "message": "⚠️ Failed to instantiate Product or Shop object from pipeline result."
-                    }
-                )
+        # The create task groups every pair by shop before it starts, so there is nothing to gain
+        # from handing out a generator; products are still loaded in batches of LISTING_PAIR_BATCH_SIZE
+        pairs = list(self._iter_listing_pairs(
+            pipeline,
+            "product_shop_instantiate_failed",
+            "⚠️ Failed to instantiate Product or Shop object from pipeline result."
+        ))
 
         self.log_action(
             event="products_ready_for_posting_pipeline",
             level="info",
             data={
-                "count": len(eligible_pairs),
-                "message": f"✅ Found {len(eligible_pairs)} Product-Shop pairs ready for listing."
+                "count": len(pairs),
+                "message": f"✅ Found {len(pairs)} Product-Shop pairs ready for listing."
             }
         )
-
-        return eligible_pairs
+        return pairs
 
     def get_products_marked_for_update(self) -> list[tuple[Product, Shop]]:
         """
@@ -305,76 +374,24 @@ class Products:
 
         Uses shorter backoff: 30 * 2^(n-1) minutes
         Allows up to MAX_FAIL_COUNT * 3 retries
+        Returns a list of (Product, Shop) tuples
         """
-        now = datetime.utcnow()
-        max_retries = MAX_FAIL_COUNT * 3
-
-        pipeline = [
-            {"$unwind": "$shops"},
-            {"$match": {
-                "shops.status": {"$in": ["update_pending", "update_error"]},
-                "shops.error_count": {"$lt": max_retries}
-            }},
-            {"$addFields": {
-                "shop_status": "$shops.status",
-                "shop_error_count": "$shops.error_count",
-                "shop_updated_at": "$shops.updated_at",
-                "shop_domain": "$shops.shop",
-                "barcode": "$barcode"
-            }},
-            {"$project": {
-                "_id": 0,
-                "barcode": 1,
-                "shop_domain": 1,
-                "shop_status": 1,
-                "shop_error_count": 1,
-                "shop_updated_at": 1
-            }}
-        ]
-
-        raw_entries = list(self.collection.aggregate(pipeline))
-        eligible_pairs = []
-
-        for entry in raw_entries:
-            status = entry["shop_status"]
-            error_count = entry["shop_error_count"]
-            updated_at = entry.get("shop_updated_at")
-
-            if status == "update_pending":
-                pass  # always eligible
-            elif status == "update_error":
-                if not updated_at:
-                    continue
-
-                wait_minutes = 30 * (2 ** (error_count - 1))
-                retry_time = updated_at + timedelta(minutes=wait_minutes)
-
-                if retry_time > now:
-                    continue  # still backing off
+        pipeline = self._shop_listing_pipeline(
+            "update_pending", "update_error", MAX_FAIL_COUNT * 3, backoff_ms=30 * 60 * 1000
+        )
 
-            try:
-                product = Product(entry["barcode"])
-                shop = Shop(entry["shop_domain"])
-                eligible_pairs.append((product, shop))
-            except Exception as e:
-                self.log_action(
-                    event="product_shop_update_load_failed",
-                    level="warning",
-                    data={
-                        "barcode": entry["barcode"],
-                        "shop_domain": entry["shop_domain"],
-                        "error": str(e),
-                        "message": "⚠️ Failed to load Product or Shop object for update."
-                    }
-                )
+        pairs = list(self._iter_listing_pairs(
+            pipeline,
+            "product_shop_update_load_failed",
+            "⚠️ Failed to load Product or Shop object for update."
+        ))
 
         self.log_action(
             event="products_ready_for_update_pipeline",
             level="info",
             data={
-                "count": len(eligible_pairs),
-                "message": f"🔁 Found {len(eligible_pairs)} Product-Shop pairs eligible for update."
+                "count": len(pairs),
+                "message": f"🔁 Found {len(pairs)} Product-Shop pairs eligible for update."
             }
         )
-
-        return eligible_pairs
+        return pairs
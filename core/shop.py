@@ -4,8 +4,10 @@ from core.MongoManager import MongoManager
 from core.encryption import encrypt_token, decrypt_token
 from core.Logger import AppLogger
 from datetime import datetime
+from functools import cached_property
 import difflib
 import re
+import threading
 from core.exceptions import ShopNotReadyError
 
 class Shop:
@@ -28,6 +30,23 @@ class Shop:
             raise ValueError(f"Shop '{domain}' does not exist. Use Shops.add_new_shop() to create it.")
 
         self.shop["settings"] = self.shop.get("settings", self.DEFAULT_SETTINGS.copy())
+        # Guards the local collections list; one Shop is shared by a shop's worker threads
+        self._collections_lock = threading.RLock()
+
+    @classmethod
+    def from_document(cls, document: dict) -> "Shop":
+        """
+        Builds a Shop around an already-fetched shop document, skipping the find_one in __init__.
+        """
+        shop = cls.__new__(cls)
+        shop.mongo = MongoManager()
+        shop.logger = AppLogger(shop.mongo)
+        shop.domain = document["shop"]
+        shop.collection = shop.mongo.shops
+        shop.shop = document
+        shop.shop["settings"] = shop.shop.get("settings", cls.DEFAULT_SETTINGS.copy())
+        shop._collections_lock = threading.RLock()
+        return shop
 
     @staticmethod
     def normalize_collection_key(value: str) -> str:
@@ -71,32 +90,36 @@ class Shop:
         )
 
     def get_settings(self):
-        current_settings = self.shop.get("settings", {})
-        updated = False
+        self.ensure_defaults()
+        return self.shop["settings"]
 
-        # Ensure all default keys are present
-        for key, default_value in self.DEFAULT_SETTINGS.items():
-            if key not in current_settings:
-                current_settings[key] = default_value
-                updated = True
+    def ensure_defaults(self) -> bool:
+        """
+        Persists any DEFAULT_SETTINGS keys missing from this shop in a single update.
+        Returns True if anything was written. get_setting() never writes; it only
+        falls back to the defaults in memory.
+        """
+        current_settings = self.shop.setdefault("settings", {})
+        missing = {key: value for key, value in self.DEFAULT_SETTINGS.items() if key not in current_settings}
 
-        # If any defaults were missing and added, persist the update
-        if updated:
-            self.collection.update_one(
-                {"shop": self.domain},
-                {"$set": {"settings": current_settings}}
-            )
-            self.shop["settings"] = current_settings
-            self.log_action(
-                event="shop_settings_autofilled_defaults",
-                level="info",
-                data={
-                    "message": "🧩 Missing default settings were added automatically.",
-                    "new_settings": current_settings
-                }
-            )
+        if not missing:
+            return False
 
-        return current_settings
+        self.collection.update_one(
+            {"shop": self.domain},
+            {"$set": {f"settings.{key}": value for key, value in missing.items()}}
+        )
+        current_settings.update(missing)
+        self._clear_exclusion_cache()
+        self.log_action(
+            event="shop_settings_autofilled_defaults",
+            level="info",
+            data={
+                "message": "🧩 Missing default settings were added automatically.",
+                "new_settings": current_settings
+            }
+        )
+        return True
 
     def update_settings(self, new_settings: dict):
         updated = {f"settings.{k}": v for k, v in new_settings.items()}
@@ -106,6 +129,7 @@ class Shop:
             upsert=True
         )
         self.shop["settings"].update(new_settings)
+        self._clear_exclusion_cache()
         self.log_action(
             event="shop_settings_updated",
             level="info",
@@ -116,38 +140,22 @@ class Shop:
         )
 
     def get_setting(self, key: str, default=None):
-        keys = key.split(".")
-        current = self.shop.get("settings", {})
-        ref = current
-
-        for k in keys[:-1]:
-            if k not in ref or not isinstance(ref[k], dict):
-                ref[k] = {}
-            ref = ref[k]
-
-        last_key = keys[-1]
-        value = ref.get(last_key)
+        """
+        Reads a (dotted) setting, falling back to DEFAULT_SETTINGS and then `default`.
+        Pure read: missing settings are not written back (see ensure_defaults()).
+        """
+        ref = self.shop.get("settings", {})
 
-        if value is not None:
-            return value
+        for k in key.split("."):
+            if not isinstance(ref, dict):
+                ref = None
+                break
+            ref = ref.get(k)
 
-        # Fallback to default if missing
-        fallback = self.DEFAULT_SETTINGS.get(key, default)
+        if ref is not None:
+            return ref
 
-        # Save fallback into DB and in-memory settings
-        self.set_setting(key, fallback)
-
-        self.log_action(
-            event="shop_setting_autofilled",
-            level="info",
-            data={
-                "key": key,
-                "value": fallback,
-                "message": f"🧩 Missing setting '{key}' was autofilled with default."
-            }
-        )
-
-        return fallback
+        return self.DEFAULT_SETTINGS.get(key, default)
 
     def set_setting(self, key: str, value):
         keys = key.split(".")
@@ -168,6 +176,7 @@ class Shop:
         for k in keys[:-1]:
             ref = ref.setdefault(k, {})
         ref[keys[-1]] = value
+        self._clear_exclusion_cache()
 
         self.log_action(
             event="shop_setting_updated",
@@ -193,14 +202,31 @@ class Shop:
             "rounding": self.get_setting("rounding", 0.99)
         }
 
-    def get_excluded_suppliers(self):
-        return list(map(lambda x: x.lower(), self.get_setting("exclude_suppliers", [])))
+    def get_excluded_suppliers(self) -> frozenset:
+        return self.excluded_suppliers_lc
+
+    def get_excluded_brands(self) -> frozenset:
+        return self.excluded_brands_lc
+
+    @cached_property
+    def excluded_suppliers_lc(self) -> frozenset:
+        """
+        Lowercased excluded supplier names, computed once per settings change
+        for use when checking many products against this shop.
+        """
+        return frozenset(map(str.lower, self.get_setting("exclude_suppliers", [])))
+
+    @cached_property
+    def excluded_brands_lc(self) -> frozenset:
+        return frozenset(map(str.lower, self.get_setting("exclude_brands", [])))
 
-    def get_excluded_brands(self):
-        return list(map(lambda x: x.lower(), self.get_setting("exclude_brands", [])))
+    def _clear_exclusion_cache(self):
+        self.__dict__.pop("excluded_suppliers_lc", None)
+        self.__dict__.pop("excluded_brands_lc", None)
 
     def reload(self):
         self.shop = self.collection.find_one({"shop": self.domain})
+        self._clear_exclusion_cache()
         return self.shop
 
     def log_action(self, event: str, level: str = "info", data: dict = None, task_id: str = None):
@@ -213,11 +239,11 @@ class Shop:
         )
 
     def is_product_eligible(self, product: dict) -> bool:
-        excluded_suppliers = self.get_excluded_suppliers()
-        excluded_brands = self.get_excluded_brands()
+        excluded_suppliers = self.excluded_suppliers_lc
+        excluded_brands = self.excluded_brands_lc
 
         for supplier in product.get("suppliers", []):
-            if supplier.get("name") in excluded_suppliers:
+            if (supplier.get("name") or "").lower() in excluded_suppliers:
                 self.log_action(
                     event="product_excluded_by_supplier",
                     level="debug",
@@ -232,7 +258,7 @@ class Shop:
         brand = product.get("barcode_lookup_data", {}).get("brand") or \
                 product.get("barcode_lookup_data", {}).get("manufacturer")
 
-        if brand and brand in excluded_brands:
+        if brand and brand.lower() in excluded_brands:
             self.log_action(
                 event="product_excluded_by_brand",
                 level="debug",
@@ -246,10 +272,48 @@ class Shop:
 
         return True
 
-    def get_eligible_product_barcodes_with_count(self, skip: int = None, limit: int = None) -> tuple[list[str], int]:
-        excluded_suppliers = self.get_excluded_suppliers()
-        excluded_brands = self.get_excluded_brands()
+    def exclusion_filters(self) -> list[dict]:
+        """
+        Query filters that drop products from excluded suppliers or brands, matching
+        is_product_eligible(): names compare case-insensitively through the stored
+        `suppliers.name_lc` and `brand_lc` (the brand, or the manufacturer when empty).
+        Documents written before those fields existed are matched on the raw names.
+        """
+        filters = []
+
+        if self.excluded_suppliers_lc:
+            # Entries written before name_lc existed fall back to a case-insensitive match on name
+            filters.append({"suppliers": {"$not": {"$elemMatch": {"$or": [
+                {"name_lc": {"$in": list(self.excluded_suppliers_lc)}},
+                {
+                    "name_lc": {"$exists": False},
+                    "name": {"$in": [
+                        re.compile(f"^{re.escape(name)}$", re.IGNORECASE) for name in self.excluded_suppliers_lc
+                    ]}
+                }
+            ]}}}})
+
+        if self.excluded_brands_lc:
+            excluded_brands = list(self.excluded_brands_lc)
+            filters.append({"$or": [
+                {"brand_lc": {"$exists": True, "$nin": excluded_brands}},
+                # Products looked up before brand_lc existed: derive it the same way at query time
+                {"brand_lc": {"$exists": False}, "$expr": {"$not": {"$in": [
+                    {"$toLower": {"$let": {
+                        "vars": {"brand": {"$ifNull": ["$barcode_lookup_data.brand", ""]}},
+                        "in": {"$cond": [
+                            {"$ne": ["$$brand", ""]},
+                            "$$brand",
+                            {"$ifNull": ["$barcode_lookup_data.manufacturer", ""]}
+                        ]}
+                    }}},
+                    excluded_brands
+                ]}}}
+            ]})
+
+        return filters
 
+    def get_eligible_product_barcodes_with_count(self, skip: int = None, limit: int = None) -> tuple[list[str], int]:
         match_conditions = {
             "ai_generate_status": "success",
             "barcode_lookup_status": "success",
@@ -257,40 +321,7 @@ class Shop:
             "shops.shop": {"$ne": self.domain},
         }
 
-        exclusion_filters = []
-
-        if excluded_suppliers:
-            exclusion_filters.append({
-                "$not": {
-                    "$elemMatch": {
-                        "suppliers": {
-                            "$elemMatch": {
-                                "name": {"$in": excluded_suppliers}
-                            }
-                        }
-                    }
-                }
-            })
-
-        if excluded_brands:
-            exclusion_filters.append({
-                "$expr": {
-                    "$not": {
-                        "$in": [
-                            {
-                                "$toLower": {
-                                    "$ifNull": [
-                                        "$barcode_lookup_data.brand",
-                                        "$barcode_lookup_data.manufacturer"
-                                    ]
-                                }
-                            },
-                            excluded_brands
-                        ]
-                    }
-                }
-            })
-
+        exclusion_filters = self.exclusion_filters()
         if exclusion_filters:
             match_conditions["$and"] = exclusion_filters
 
@@ -600,17 +631,14 @@ class Shop:
                     continue
                 seen_titles.add(normalized)
 
-                if self.resolve_collection_id(title=title):
-                    continue  # already exists
-
                 try:
-                    created = self.client.create_collection(title=title, task_id=task_id)
-                    self.add_local_collection(created)
+                    collection_gid, created = self.get_or_create_collection(title, task_id=task_id)
+                    if not created:
+                        continue  # already exists
                     created_titles.append(title)
                     self.log_action("collection_created_bulk", "info", {
                         "title": title,
-                        "collection_id": created.get("id"),
-                        "collection_gid": created.get("gid"),
+                        "collection_gid": collection_gid,
                         "message": "✅ Collection created during preflight batch step."
                     }, task_id=task_id)
 
@@ -684,20 +712,36 @@ class Shop:
             )
             return False
 
+    def get_or_create_collection(self, title: str, task_id: str = None) -> tuple[str, bool]:
+        """
+        Returns (collection gid, created) for `title`, creating the collection on Shopify
+        if the local cache doesn't have it. Resolve and create happen under one lock, so
+        worker threads sharing this Shop can't create the same collection twice.
+        """
+        with self._collections_lock:
+            collection_gid = self.resolve_collection_id(title=title)
+            if collection_gid:
+                return collection_gid, False
+
+            created = self.client.create_collection(title=title, task_id=task_id)
+            self.add_local_collection(created)
+            return created["gid"], True
+
     def add_local_collection(self, collection: dict):
-        existing = self.shop.get("collections", [])
-        if any(str(c["id"]) == str(collection["id"]) for c in existing):
-            return False  # Already exists
+        with self._collections_lock:
+            existing = self.shop.get("collections", [])
+            if any(str(c["id"]) == str(collection["id"]) for c in existing):
+                return False  # Already exists
 
-        # ✅ Normalize handle/title on insert
-        collection["normalized_title"] = self.normalize_collection_key(collection.get("title", ""))
-        collection["normalized_handle"] = self.normalize_collection_key(collection.get("handle", ""))
+            # ✅ Normalize handle/title on insert
+            collection["normalized_title"] = self.normalize_collection_key(collection.get("title", ""))
+            collection["normalized_handle"] = self.normalize_collection_key(collection.get("handle", ""))
 
-        self.shop.setdefault("collections", []).append(collection)
-        self.collection.update_one(
-            {"shop": self.domain},
-            {"$push": {"collections": collection}}
-        )
+            self.shop.setdefault("collections", []).append(collection)
+            self.collection.update_one(
+                {"shop": self.domain},
+                {"$push": {"collections": collection}}
+            )
 
         self.log_action(
             event="local_collection_added",
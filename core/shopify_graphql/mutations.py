@@ -9,6 +9,9 @@ mutation productCreate($input: ProductInput!) {
         edges {
           node {
             id
+            inventoryItem {
+              id
+            }
           }
         }
       }
@@ -72,6 +75,20 @@ mutation collectionAddProducts($id: ID!, $productIds: [ID!]!) {
 }
 """
 
+PRODUCT_JOIN_COLLECTIONS_MUTATION = """
+mutation productJoinCollections($product: ProductUpdateInput!) {
+  productUpdate(product: $product) {
+    product {
+      id
+    }
+    userErrors {
+      field
+      message
+    }
+  }
+}
+"""
+
 COLLECTION_CREATE_MUTATION = """
 mutation collectionCreate($input: CollectionInput!) {
   collectionCreate(input: $input) {
@@ -108,4 +125,21 @@ mutation productUpdateImages($productId: ID!, $images: [ImageInput!]!) {
     }
   }
 }
-"""
\ No newline at end of file
+"""
+
+PRODUCT_CREATE_MEDIA_MUTATION = """
+mutation productCreateMedia($productId: ID!, $media: [CreateMediaInput!]!) {
+  productCreateMedia(productId: $productId, media: $media) {
+    media {
+      alt
+      mediaContentType
+      status
+    }
+    mediaUserErrors {
+      field
+      message
+      code
+    }
+  }
+}
+"""
@@ -3,6 +3,7 @@
 from core.MongoManager import MongoManager
 from core.Logger import AppLogger
 from core.shop import Shop
+from core.product import Product
 
 
 class Shops:
@@ -22,7 +23,7 @@ class Shops:
     def get_by_domain(self, shop_domain: str) -> Shop | None:
         shop_data = self.collection.find_one({"shop": shop_domain})
         if shop_data:
-            return Shop(shop_domain)
+            return Shop.from_document(shop_data)
         return None
 
     def get_all_shops(self):
@@ -39,7 +40,7 @@ class Shops:
     def get_ready_shops(self):
         ready = []
         for shop_data in self.collection.find():
-            shop = Shop(shop_data["shop"])
+            shop = Shop.from_document(shop_data)
             if shop.is_ready_for_listing():
                 ready.append(shop)
         self.log_action(
@@ -72,7 +73,7 @@ class Shops:
                     "message": "⚠️ Attempted to create shop but it already exists."
                 }
             )
-            return Shop(shop_domain)  # ✅ return existing instance
+            return Shop.from_document(existing)  # ✅ return existing instance
 
         defaults = settings or Shop.DEFAULT_SETTINGS.copy()
 
@@ -129,6 +130,7 @@ class Shops:
                 {"shops.shop": shop_domain},
                 {"$pull": {"shops": {"shop": shop_domain}}}
             )
+            Product.clear_cache()
 
             self.log_action(
                 event="shop_references_removed_from_products",
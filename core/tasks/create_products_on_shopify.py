@@ -6,12 +6,14 @@ from collections import defaultdict
 
 from core.products import Products
 from core.Logger import AppLogger
+from core.config import SHOPIFY_PER_SHOP_WORKERS
 from core.exceptions import ShopNotReadyError
 
 logger = AppLogger()
 
 
-def create_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max_workers=3, dry_run=False):
+def create_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max_workers=3, dry_run=False,
+                               per_shop_workers=SHOPIFY_PER_SHOP_WORKERS):
     task_id = logger.log_task_start("create_products_on_shopify", count=0)
     start_time = time.time()
 
@@ -57,7 +59,7 @@ def create_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max
             shop = product_shop_list[0][1]
             products = [ps[0] for ps in product_shop_list]
             futures.append(executor.submit(
-                _process_shop_products, shop, products, task_id, dry_run
+                _process_shop_products, shop, products, task_id, dry_run, per_shop_workers
             ))
 
         for future in as_completed(futures):
@@ -82,7 +84,7 @@ def create_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max
     )
 
 
-def _process_shop_products(shop, products, task_id, dry_run):
+def _process_shop_products(shop, products, task_id, dry_run, per_shop_workers=SHOPIFY_PER_SHOP_WORKERS):
     success = 0
     failed = 0
     skipped = 0
@@ -110,13 +112,15 @@ def _process_shop_products(shop, products, task_id, dry_run):
         ai = product.product.get("ai_generated_data", {})
         if not ai:
             continue
-        titles = list(filter(None, [ai.get("primary_collection")] + (ai.get("secondary_collections") or [])))
-        collection_titles.extend(titles)
+        collection_titles.extend(
+            title for title in (ai.get("primary_collection"), *(ai.get("secondary_collections") or ())) if title
+        )
+    unique_titles = set(collection_titles)
 
     shop.log_action("preflight_collection_titles_gathered", "debug", {
         "count": len(collection_titles),
-        "unique": len(set(collection_titles)),
-        "titles": list(set(collection_titles)),
+        "unique": len(unique_titles),
+        "titles": list(unique_titles),
         "message": "📋 Gathered collection titles for preflight."
     }, task_id=task_id)
 
@@ -134,41 +138,50 @@ def _process_shop_products(shop, products, task_id, dry_run):
             "message": "✅ No new collections needed before listing."
         }, task_id=task_id)
 
-    for product in products:
-        if dry_run:
+    if dry_run:
+        for product in products:
             product.log_action("dry_run_product", "info", {
                 "shop": shop.domain,
                 "message": "🧪 Dry run — product would be created on Shopify."
             }, task_id=task_id)
-            skipped += 1
-            continue
+        return {"success": 0, "failed": 0, "skipped": len(products)}
 
-        product.log_action("shopify_product_attempt_start", "debug", {
-            "shop": shop.domain,
-            "message": "🚀 Attempting to create product on Shopify."
-        }, task_id=task_id)
+    with ThreadPoolExecutor(max_workers=per_shop_workers) as executor:
+        futures = [executor.submit(_create_product, shop, product, task_id) for product in products]
+        for future in as_completed(futures):
+            if future.result():
+                success += 1
+            else:
+                failed += 1
 
-        shop.log_action("_process_product_creation_collection_check", "debug", {
-            "collections_in_shop": shop.shop.get("collections", [])
-        })
+    return {"success": success, "failed": failed, "skipped": skipped}
 
-        try:
-            product.create_on_shopify(shop, task_id=task_id)
-            product.log_action("shopify_product_created", "success", {
-                "shop": shop.domain,
-                "message": "✅ Product successfully created on Shopify."
-            }, task_id=task_id)
-            time.sleep(3)
-            success += 1
-        except Exception as e:
-            product.log_action("shopify_product_create_failed", "error", {
-                "shop": shop.domain,
-                "message": "❌ Product creation on Shopify failed.",
-                "error": str(e)
-            }, task_id=task_id)
-            failed += 1
 
-    return {"success": success, "failed": failed, "skipped": skipped}
+def _create_product(shop, product, task_id) -> bool:
+    product.log_action("shopify_product_attempt_start", "debug", {
+        "shop": shop.domain,
+        "message": "🚀 Attempting to create product on Shopify."
+    }, task_id=task_id)
+
+    shop.log_action("_process_product_creation_collection_check", "debug", {
+        "collections_in_shop": shop.shop.get("collections", [])
+    })
+
+    try:
+        product.create_on_shopify(shop, task_id=task_id)
+        product.log_action("shopify_product_created", "success", {
+            "shop": shop.domain,
+            "message": "✅ Product successfully created on Shopify."
+        }, task_id=task_id)
+        time.sleep(3)
+        return True
+    except Exception as e:
+        product.log_action("shopify_product_create_failed", "error", {
+            "shop": shop.domain,
+            "message": "❌ Product creation on Shopify failed.",
+            "error": str(e)
+        }, task_id=task_id)
+        return False
 
 
 if __name__ == "__main__":
@@ -178,6 +191,8 @@ if __name__ == "__main__":
     parser.add_argument("--shop", action="append", help="Limit to specific shop(s). Can be passed multiple times.")
     parser.add_argument("--limit", type=int, help="Maximum number of products to process.")
     parser.add_argument("--workers", type=int, default=4, help="Thread pool max workers (default: 4)")
+    parser.add_argument("--per-shop-workers", type=int, default=SHOPIFY_PER_SHOP_WORKERS,
+                        help=f"Products created concurrently per shop (default: {SHOPIFY_PER_SHOP_WORKERS})")
     parser.add_argument("--dry-run", action="store_true", help="Perform a dry run without creating products.")
 
     args = parser.parse_args()
@@ -188,5 +203,6 @@ if __name__ == "__main__":
             shop_domains=args.shop,
             limit=args.limit,
             max_workers=args.workers,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            per_shop_workers=args.per_shop_workers
         )
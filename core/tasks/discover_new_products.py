@@ -6,7 +6,7 @@ from suppliers.dummy_supplier import DummySupplier
 from suppliers.tropicana_wholesale_supplier import TropicanaWholesaleSupplier
 from core.MongoManager import MongoManager
 from core.products import Products
-from core.product import Product
+from core.product import Product, ProductWriter
 from core.Logger import AppLogger
 
 mongo = MongoManager()
@@ -43,6 +43,8 @@ def process_barcodes_for_supplier(
 
     for i in range(0, len(supplier_barcodes), batch_size):
         batch = supplier_barcodes[i:i + batch_size]
+        # Only checked for existence/links; supplier adds are guarded server-side
+        existing_products = Product.bulk_load(batch, cached=True)
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_barcode = {
@@ -56,8 +58,8 @@ def process_barcodes_for_supplier(
                 if product_data is None:
                     continue
 
-                product = mongo.db.products.find_one({"barcode": barcode})
-                if not product:
+                product_obj = existing_products.get(barcode)
+                if not product_obj:
                     if max_new_products and len(new_barcodes) >= max_new_products:
                         return new_barcodes, new_supplier_links
 
@@ -69,9 +71,7 @@ def process_barcodes_for_supplier(
                     }
                     products.add_new_product(barcode=barcode, supplier_data=supplier_data)
                 else:
-                    product_obj = Product(barcode)
-                    existing_suppliers = [s["name"] for s in product.get("suppliers", [])]
-                    if supplier.name not in existing_suppliers:
+                    if not product_obj.has_supplier(supplier.name):
                         supplier_data = {
                             "name": supplier.name,
                             "data": product_data['data'],
@@ -95,6 +95,7 @@ def process_barcodes_for_supplier(
                             },
                             array_filters=[{"elem.status": {"$in": ["created", "updated"]}}]
                         )
+                        Product.invalidate(barcode)
 
                         logger.log(
                             event="supplier_added_to_product",
@@ -113,22 +114,23 @@ def process_barcodes_for_supplier(
 
 def prune_supplier_links_for_supplier(supplier_name, all_barcodes, task_id=None):
     pruned_supplier_links = []
-    for product in mongo.db.products.find({"suppliers.name": supplier_name}):
-        if product["barcode"] not in all_barcodes:
-            product_obj = Product(product["barcode"])
-            product_obj.prune_supplier_link(supplier_name)
-            pruned_supplier_links.append(product["barcode"])
-            logger.log(
-                event="supplier_pruned_from_product",
-                store=None,
-                level="info",
-                task_id=task_id,
-                data={
-                    "barcode": product["barcode"],
-                    "supplier": supplier_name,
-                    "message": f"Supplier {supplier_name} pruned from product."
-                }
-            )
+    with logger.batch(), ProductWriter():
+        for product in mongo.db.products.find({"suppliers.name": supplier_name}):
+            if product["barcode"] not in all_barcodes:
+                product_obj = Product.from_document(product)
+                product_obj.prune_supplier_link(supplier_name)
+                pruned_supplier_links.append(product["barcode"])
+                logger.log(
+                    event="supplier_pruned_from_product",
+                    store=None,
+                    level="info",
+                    task_id=task_id,
+                    data={
+                        "barcode": product["barcode"],
+                        "supplier": supplier_name,
+                        "message": f"Supplier {supplier_name} pruned from product."
+                    }
+                )
     return pruned_supplier_links
 
 def discover_new_products(batch_size=500, limit_per_supplier=None, brand_filters=None, max_new_products=None):
@@ -155,12 +157,13 @@ def discover_new_products(batch_size=500, limit_per_supplier=None, brand_filters
         try:
             supplier_barcodes = supplier.get_all_barcodes()
             if brand_filters:
+                wanted_brands = frozenset(brand.lower() for brand in brand_filters)
                 filtered = []
                 for b in supplier_barcodes:
                     try:
                         data = supplier.get_product_by_barcode(b)
                         brand = data['parsed']['brand'].strip().lower()
-                        if brand in [brand.lower() for brand in brand_filters]:
+                        if brand in wanted_brands:
                             filtered.append(b)
                     except Exception as e:
                         logger.log_product_error(barcode=b, error=f"Brand filter error: {str(e)}", task_id=task_id)
@@ -185,7 +185,7 @@ def enrich_products(limit=None, barcodes=None, brand=None):
     if brand:
         query["barcode_lookup_data.brand"] = brand
 
-    cursor = mongo.db.products.find(query)
+    cursor = mongo.db.products.find(query, {"_id": 0, "barcode": 1})
     if limit:
         cursor = cursor.limit(limit)
 
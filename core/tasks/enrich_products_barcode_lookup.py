@@ -7,7 +7,7 @@ import requests
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from core.MongoManager import MongoManager
-from core.product import Product
+from core.product import Product, BARCODE_LOOKUP_FIELDS
 from core.products import Products
 from core.Logger import AppLogger
 from core.config import BARCODELOOKUP_API_KEY, USE_DUMMY_DATA, ENABLE_BARCODELOOKUP_CACHE
@@ -109,7 +109,7 @@ def enrich_product(barcode, stats=None, task_id=None):
         "message": f"🔄 Enriching product {barcode}"
     })
 
-    product = Product(barcode)
+    product = Product(barcode, fields=BARCODE_LOOKUP_FIELDS)
 
     if product.product and product.product.get("barcode_lookup_status") == "pending":
         product_data = fetch_product_data_from_barcodelookup(barcode, stats=stats)
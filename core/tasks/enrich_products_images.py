@@ -8,7 +8,7 @@ from PIL import Image
 from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from core.MongoManager import MongoManager
-from core.product import Product
+from core.product import Product, IMAGE_ENRICHMENT_FIELDS
 from core.products import Products
 from core.Logger import AppLogger
 from core.config import (
@@ -109,12 +109,13 @@ def upload_to_bunny(barcode, image_url, index):
         return None
 
 
-def enrich_product_images(barcode, task_id=None, stats=None):
+def enrich_product_images(barcode, task_id=None, stats=None, product=None):
     logger.log("image_enrichment_start", level="info", task_id=task_id, data={
         "barcode": barcode,
         "message": "\ud83d\uddbc\ufe0f Starting image enrichment"
     })
-    product = Product(barcode)
+    if product is None:
+        product = Product(barcode, fields=IMAGE_ENRICHMENT_FIELDS)
 
     if not product.product or \
        product.product.get("images_status") != "pending" or \
@@ -169,7 +170,7 @@ def enrich_images(batch_size=50):
     barcodes = [p["barcode"] for p in mongo.db.products.find({
         "barcode_lookup_status": "success",
         "images_status": {"$in": [None, "pending"]}
-    })]
+    }, {"_id": 0, "barcode": 1})]
 
     logger.log("image_enrichment_found", level="info", task_id=task_id, data={
         "count": len(barcodes),
@@ -182,8 +183,14 @@ def enrich_images(batch_size=50):
         "no_images": 0
     }
 
+    # Load the whole batch in one query instead of a find_one per worker
+    products = Product.bulk_load(barcodes[:batch_size], fields=IMAGE_ENRICHMENT_FIELDS)
+
     with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = {executor.submit(enrich_product_images, b, task_id, stats): b for b in barcodes[:batch_size]}
+        futures = {
+            executor.submit(enrich_product_images, b, task_id, stats, products.get(b)): b
+            for b in barcodes[:batch_size]
+        }
         for future in as_completed(futures):
             try:
                 future.result()
@@ -3,7 +3,8 @@
 import sys
 import time
 from core.shops import Shops
-from core.product import Product
+from core.product import Product, ProductWriter, LISTING_CHECK_FIELDS
+from core.exceptions import ProductNotFoundError
 from core.Logger import AppLogger
 
 logger = AppLogger()
@@ -19,6 +20,7 @@ def flag_products_to_create():
     failed = 0
 
     for shop in shops:
+        writer = ProductWriter()
         try:
             barcodes, total = shop.get_eligible_product_barcodes_with_count()
 
@@ -32,70 +34,14 @@ def flag_products_to_create():
                 task_id=task_id
             )
 
-            for barcode in barcodes:
-                try:
-                    product = Product(barcode)
-
-                    if product.has_shop_listing(shop):
-                        # already known, skip
-                        logger.log(
-                            event="product_already_flagged",
-                            level="debug",
-                            store=shop.domain,
-                            data={
-                                "barcode": barcode,
-                                "message": f"⚠️ Product already flagged for {shop.domain}, skipping."
-                            },
-                            task_id=task_id
-                        )
-                        continue
-
-                    best_supplier = product.get_best_supplier_for_shop(shop)
-                    if not best_supplier:
-                        logger.log(
-                            event="product_no_supplier_available",
-                            level="warning",
-                            store=shop.domain,
-                            data={
-                                "barcode": barcode,
-                                "message": "⚠️ No valid supplier found for product. Skipping."
-                            },
-                            task_id=task_id
-                        )
-                        continue
-
-                    listing_data = {
-                        "status": "create_pending",
-                    }
-
-                    product.mark_listed_to_shop(shop, listing_data)
-                    total_flagged += 1
-
-                except Exception as e:
-                    failed += 1
-                    try:
-                        product.log_action(
-                            event="product_flag_create_pending_failed",
-                            level="error",
-                            data={
-                                "shop": shop.domain,
-                                "message": "❌ Failed to mark product as pending for listing.",
-                                "error": str(e)
-                            },
-                            task_id=task_id
-                        )
-                    except Exception as inner:
-                        logger.log(
-                            event="product_flag_create_pending_failed_fallback",
-                            level="error",
-                            store=shop.domain,
-                            data={
-                                "barcode": barcode,
-                                "error": str(e),
-                                "fallback_error": str(inner)
-                            },
-                            task_id=task_id
-                        )
+            # Flagging only reads suppliers and existing shop entries; skip the enrichment blobs
+            products = Product.bulk_load(barcodes, fields=LISTING_CHECK_FIELDS)
+
+            # The create_pending listing writes are queued and sent with bulk_write
+            with logger.batch(), writer:
+                for barcode in barcodes:
+                    if _flag_product(shop, barcode, products.get(barcode), task_id) == "failed":
+                        failed += 1
 
         except Exception as e:
             failed += 1
@@ -110,6 +56,9 @@ def flag_products_to_create():
                 task_id=task_id
             )
 
+        # Each flag is one queued listing write, so count what the database applied
+        total_flagged += writer.modified_count
+
     duration = time.time() - start
     logger.log_task_end(
         task_id=task_id,
@@ -120,6 +69,74 @@ def flag_products_to_create():
     )
 
 
+def _flag_product(shop, barcode, product, task_id):
+    try:
+        if product is None:
+            raise ProductNotFoundError(barcode)
+
+        if product.has_shop_listing(shop):
+            # already known, skip
+            logger.log(
+                event="product_already_flagged",
+                level="debug",
+                store=shop.domain,
+                data={
+                    "barcode": barcode,
+                    "message": f"⚠️ Product already flagged for {shop.domain}, skipping."
+                },
+                task_id=task_id
+            )
+            return "skipped"
+
+        best_supplier = product.get_best_supplier_for_shop(shop)
+        if not best_supplier:
+            logger.log(
+                event="product_no_supplier_available",
+                level="warning",
+                store=shop.domain,
+                data={
+                    "barcode": barcode,
+                    "message": "⚠️ No valid supplier found for product. Skipping."
+                },
+                task_id=task_id
+            )
+            return "skipped"
+
+        listing_data = {
+            "status": "create_pending",
+        }
+
+        product.mark_listed_to_shop(shop, listing_data)
+        return "flagged"
+
+    except Exception as e:
+        try:
+            product.log_action(
+                event="product_flag_create_pending_failed",
+                level="error",
+                data={
+                    "shop": shop.domain,
+                    "message": "❌ Failed to mark product as pending for listing.",
+                    "error": str(e)
+                },
+                task_id=task_id
+            )
+        except Exception as inner:
+            logger.log(
+                event="product_flag_create_pending_failed_fallback",
+                level="error",
+                store=shop.domain,
+                data={
+                    "barcode": barcode,
+                    "error": str(e),
+                    "fallback_error": str(inner)
+                },
+                task_id=task_id
+            )
+
+        return "failed"
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "flag_products_to_create":
         flag_products_to_create()
@@ -6,11 +6,13 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from core.products import Products
 from core.Logger import AppLogger
+from core.config import SHOPIFY_PER_SHOP_WORKERS
 from core.exceptions import ShopNotReadyError
 
 logger = AppLogger()
 
-def update_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max_workers=4, dry_run=False):
+def update_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max_workers=4, dry_run=False,
+                               per_shop_workers=SHOPIFY_PER_SHOP_WORKERS):
     task_id = logger.log_task_start("update_products_on_shopify", count=0)
     start_time = time.time()
 
@@ -54,7 +56,7 @@ def update_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max
             shop = product_shop_list[0][1]
             products = [ps[0] for ps in product_shop_list]
             futures.append(executor.submit(
-                _process_shop_updates, shop, products, task_id, dry_run
+                _process_shop_updates, shop, products, task_id, dry_run, per_shop_workers
             ))
 
         for future in as_completed(futures):
@@ -78,7 +80,7 @@ def update_products_on_shopify(barcodes=None, shop_domains=None, limit=None, max
         duration=duration
     )
 
-def _process_shop_updates(shop, products, task_id, dry_run):
+def _process_shop_updates(shop, products, task_id, dry_run, per_shop_workers=SHOPIFY_PER_SHOP_WORKERS):
     success = 0
     failed = 0
     skipped = 0
@@ -100,49 +102,61 @@ def _process_shop_updates(shop, products, task_id, dry_run):
         }, task_id=task_id)
         return {"success": 0, "failed": 0, "skipped": len(products)}
 
-    for product in products:
-        if dry_run:
+    if dry_run:
+        for product in products:
             product.log_action("dry_run_shopify_update", "info", {
                 "shop": shop.domain,
                 "message": "🧪 Dry run — product would be updated on Shopify."
             }, task_id=task_id)
-            skipped += 1
-            continue
+        return {"success": 0, "failed": 0, "skipped": len(products)}
 
-        product.log_action("shopify_update_attempt_start", "debug", {
-            "shop": shop.domain,
-            "message": "🔁 Attempting to update product on Shopify."
-        }, task_id=task_id)
+    with ThreadPoolExecutor(max_workers=per_shop_workers) as executor:
+        futures = [executor.submit(_update_product, shop, product, task_id) for product in products]
+        for future in as_completed(futures):
+            outcome = future.result()
+            if outcome == "success":
+                success += 1
+            elif outcome == "skipped":
+                skipped += 1
+            else:
+                failed += 1
 
-        try:
-            updated = product.update_on_shopify(shop, task_id=task_id)
+    return {"success": success, "failed": failed, "skipped": skipped}
 
-            if updated not in (True, False):
-                product.log_action("shopify_update_result_unclear", "warning", {
-                    "message": "⚠️ update_on_shopify() returned a non-boolean result."
-                }, task_id=task_id)
 
-            if updated:
-                product.log_action("shopify_product_updated", "success", {
-                    "shop": shop.domain,
-                    "message": "✅ Product updated on Shopify."
-                }, task_id=task_id)
-                success += 1
-            else:
-                product.log_action("shopify_product_update_skipped", "debug", {
-                    "shop": shop.domain,
-                    "message": "No update needed."
-                }, task_id=task_id)
-                skipped += 1
-        except Exception as e:
-            product.log_action("shopify_update_failed", "error", {
+def _update_product(shop, product, task_id) -> str:
+    product.log_action("shopify_update_attempt_start", "debug", {
+        "shop": shop.domain,
+        "message": "🔁 Attempting to update product on Shopify."
+    }, task_id=task_id)
+
+    try:
+        updated = product.update_on_shopify(shop, task_id=task_id)
+
+        if updated not in (True, False):
+            product.log_action("shopify_update_result_unclear", "warning", {
+                "message": "⚠️ update_on_shopify() returned a non-boolean result."
+            }, task_id=task_id)
+
+        if updated:
+            product.log_action("shopify_product_updated", "success", {
                 "shop": shop.domain,
-                "message": "❌ Product update on Shopify failed.",
-                "error": str(e)
+                "message": "✅ Product updated on Shopify."
             }, task_id=task_id)
-            failed += 1
+            return "success"
 
-    return {"success": success, "failed": failed, "skipped": skipped}
+        product.log_action("shopify_product_update_skipped", "debug", {
+            "shop": shop.domain,
+            "message": "No update needed."
+        }, task_id=task_id)
+        return "skipped"
+    except Exception as e:
+        product.log_action("shopify_update_failed", "error", {
+            "shop": shop.domain,
+            "message": "❌ Product update on Shopify failed.",
+            "error": str(e)
+        }, task_id=task_id)
+        return "failed"
 
 
 if __name__ == "__main__":
@@ -152,6 +166,8 @@ if __name__ == "__main__":
     parser.add_argument("--shop", action="append", help="Limit to specific shop(s). Can be passed multiple times.")
     parser.add_argument("--limit", type=int, help="Maximum number of products to process.")
     parser.add_argument("--workers", type=int, default=4, help="Thread pool max workers (default: 4)")
+    parser.add_argument("--per-shop-workers", type=int, default=SHOPIFY_PER_SHOP_WORKERS,
+                        help=f"Products updated concurrently per shop (default: {SHOPIFY_PER_SHOP_WORKERS})")
     parser.add_argument("--dry-run", action="store_true", help="Perform a dry run without making updates.")
 
     args = parser.parse_args()
@@ -162,5 +178,6 @@ if __name__ == "__main__":
             shop_domains=args.shop,
             limit=args.limit,
             max_workers=args.workers,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            per_shop_workers=args.per_shop_workers
         )
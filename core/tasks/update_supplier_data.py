@@ -1,7 +1,8 @@
 import time
 from core.MongoManager import MongoManager
 from core.Logger import AppLogger
-from core.product import Product
+from core.product import Product, ProductWriter, SUPPLIER_SYNC_FIELDS
+from pymongo import UpdateOne
 from core.products import Products
 from suppliers.tropicana_wholesale_supplier import TropicanaWholesaleSupplier
 from suppliers.dummy_supplier import DummySupplier
@@ -9,6 +10,18 @@ from suppliers.dummy_supplier import DummySupplier
 mongo = MongoManager()
 logger = AppLogger(mongo)
 
+def _mark_shops_update_pending(barcode):
+    return UpdateOne(
+        {
+            "barcode": barcode,
+            "shops.status": {"$in": ["created", "updated"]}
+        },
+        {
+            "$set": {"shops.$[elem].status": "update_pending"}
+        },
+        array_filters=[{"elem.status": {"$in": ["created", "updated"]}}]
+    )
+
 def update_supplier_data(dry_run=False, limit=None):
     task_id = logger.log_task_start("update_supplier_data")
     start_time = time.time()
@@ -41,63 +54,49 @@ def update_supplier_data(dry_run=False, limit=None):
             "suppliers.name": supplier_name
         }
 
-        cursor = mongo.db.products.find(query).limit(limit) if limit else mongo.db.products.find(query)
+        # Only the supplier entries are diffed, so the rest of each document stays on the server
+        cursor = mongo.db.products.find(query, SUPPLIER_SYNC_FIELDS)
+        if limit:
+            cursor = cursor.limit(limit)
 
         seen_barcodes = set()
 
-        for doc in cursor:
-            barcode = doc["barcode"]
-            seen_barcodes.add(barcode)
-            product_obj = Product(barcode)
-            existing = next((s for s in doc["suppliers"] if s["name"] == supplier_name), None)
-
-            if barcode not in all_supplier_barcodes:
-                logger.log("supplier_barcode_missing", level="info", task_id=task_id, data={
-                    "barcode": barcode,
-                    "supplier": supplier_name,
-                    "message": "Barcode no longer present in supplier feed. Removing link."
-                })
-                if not dry_run:
-                    product_obj.prune_supplier_link(supplier_name)
-                    mongo.db.products.update_one(
-                        {
-                            "barcode": barcode,
-                            "shops.status": {"$in": ["created", "updated"]}
-                        },
-                        {
-                            "$set": {"shops.$[elem].status": "update_pending"}
-                        },
-                        array_filters=[{"elem.status": {"$in": ["created", "updated"]}}]
-                    )
-                pruned_count += 1
-                continue
-
-            new_data = barcode_to_data[barcode]
-            changes = product_obj.update_supplier_entry(
-                supplier_name=supplier_name,
-                new_data=new_data["data"],
-                new_parsed=new_data["parsed"],
-                dry_run=dry_run
-            )
-
-            if changes["parsed"] or changes["data"]:
-                logger.log("supplier_data_changed", level="info", task_id=task_id, data={
-                    "barcode": barcode,
-                    "supplier": supplier_name,
-                    "updates": changes
-                })
-                if not dry_run:
-                    mongo.db.products.update_one(
-                        {
-                            "barcode": barcode,
-                            "shops.status": {"$in": ["created", "updated"]}
-                        },
-                        {
-                            "$set": {"shops.$[elem].status": "update_pending"}
-                        },
-                        array_filters=[{"elem.status": {"$in": ["created", "updated"]}}]
-                    )
-                updated_count += 1
+        # Supplier and shop status writes are queued and sent with bulk_write
+        with logger.batch(), ProductWriter() as writer:
+            for doc in cursor:
+                barcode = doc["barcode"]
+                seen_barcodes.add(barcode)
+                product_obj = Product.from_document(doc)
+
+                if barcode not in all_supplier_barcodes:
+                    logger.log("supplier_barcode_missing", level="info", task_id=task_id, data={
+                        "barcode": barcode,
+                        "supplier": supplier_name,
+                        "message": "Barcode no longer present in supplier feed. Removing link."
+                    })
+                    if not dry_run:
+                        product_obj.prune_supplier_link(supplier_name)
+                        writer.queue(_mark_shops_update_pending(barcode), barcode=barcode)
+                    pruned_count += 1
+                    continue
+
+                new_data = barcode_to_data[barcode]
+                changes = product_obj.update_supplier_entry(
+                    supplier_name=supplier_name,
+                    new_data=new_data["data"],
+                    new_parsed=new_data["parsed"],
+                    dry_run=dry_run
+                )
+
+                if changes["parsed"] or changes["data"]:
+                    logger.log("supplier_data_changed", level="info", task_id=task_id, data={
+                        "barcode": barcode,
+                        "supplier": supplier_name,
+                        "updates": changes
+                    })
+                    if not dry_run:
+                        writer.queue(_mark_shops_update_pending(barcode), barcode=barcode)
+                    updated_count += 1
 
         logger.log("supplier_update_complete", level="info", task_id=task_id, data={
             "supplier": supplier_name,
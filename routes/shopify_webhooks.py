@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Request, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import hmac, hashlib, base64
 from datetime import datetime
 from core.config import SHOPIFY_API_SECRET
@@ -20,8 +21,9 @@ def verify_hmac(hmac_header: str, body: bytes) -> bool:
     return hmac.compare_digest(calc_hmac, hmac_header)
 
 # --- Webhook Topic Handlers ---
+# Plain functions: they are run in the threadpool by handle_shopify_webhook().
 
-async def handle_app_uninstalled(shop_domain: str, payload: dict):
+def handle_app_uninstalled(shop_domain: str, payload: dict):
     shop = Shop(shop_domain)
     if shop:
         shops.delete_shop(shop_domain)
@@ -39,7 +41,7 @@ async def handle_app_uninstalled(shop_domain: str, payload: dict):
             level="warning"
         )
 
-async def handle_collection_created(shop_domain: str, payload: dict):
+def handle_collection_created(shop_domain: str, payload: dict):
     shop = Shop(shop_domain)
     collection = {
         "id": str(payload["id"]),
@@ -58,7 +60,7 @@ async def handle_collection_created(shop_domain: str, payload: dict):
         )
 
 
-async def handle_collection_updated(shop_domain: str, payload: dict):
+def handle_collection_updated(shop_domain: str, payload: dict):
     shop = Shop(shop_domain)
     updated_data = {
         "id": str(payload["id"]),
@@ -78,7 +80,7 @@ async def handle_collection_updated(shop_domain: str, payload: dict):
         )
 
 
-async def handle_collection_deleted(shop_domain: str, payload: dict):
+def handle_collection_deleted(shop_domain: str, payload: dict):
     shop = Shop(shop_domain)
     collection_id = str(payload.get("id"))
 
@@ -92,8 +94,8 @@ async def handle_collection_deleted(shop_domain: str, payload: dict):
             }
         )
 
-async def handle_product_deleted(shop_domain: str, payload: dict):
-    from core.product import Product
+def handle_product_deleted(shop_domain: str, payload: dict):
+    from core.product import Product, SHOP_LISTING_FIELDS
     shop = Shop(shop_domain)
     product_id = str(payload.get("id"))
 
@@ -102,7 +104,7 @@ async def handle_product_deleted(shop_domain: str, payload: dict):
 
     result = mongo.db.products.find_one(
         {"shops": {"$elemMatch": {"shop": shop.domain, "shopify_id": product_id}}},
-        {"barcode": 1}
+        SHOP_LISTING_FIELDS
     )
 
     if not result:
@@ -112,7 +114,7 @@ async def handle_product_deleted(shop_domain: str, payload: dict):
         })
         return
 
-    product = Product(result["barcode"])
+    product = Product.from_document(result)
 
     product.mark_listed_to_shop(shop, {
         "status": "unmanaged",
@@ -125,7 +127,7 @@ async def handle_product_deleted(shop_domain: str, payload: dict):
         "message": "🛑 Product marked as unmanaged after Shopify deletion."
     })
 
-async def handle_customers_data_request(shop_domain: str, payload: dict):
+def handle_customers_data_request(shop_domain: str, payload: dict):
     shop = Shop(shop_domain)
     shop.log_action(
         event="privacy_customers_data_request",
@@ -136,7 +138,7 @@ async def handle_customers_data_request(shop_domain: str, payload: dict):
         }
     )
 
-async def handle_customers_redact(shop_domain: str, payload: dict):
+def handle_customers_redact(shop_domain: str, payload: dict):
     shop = Shop(shop_domain)
     shop.log_action(
         event="privacy_customers_redact",
@@ -147,7 +149,7 @@ async def handle_customers_redact(shop_domain: str, payload: dict):
         }
     )
 
-async def handle_shop_redact(shop_domain: str, payload: dict):
+def handle_shop_redact(shop_domain: str, payload: dict):
     shop = Shop(shop_domain)
     shop.log_action(
         event="privacy_shop_redact",
@@ -212,6 +214,7 @@ async def handle_shopify_webhook(
         data={"topic": topic, "payload": payload}
     )
 
-    await WEBHOOK_HANDLERS[topic](x_shopify_shop_domain, payload)
+    # Handlers make blocking MongoDB/Shopify calls, so keep them off the event loop
+    await run_in_threadpool(WEBHOOK_HANDLERS[topic], x_shopify_shop_domain, payload)
 
     return {"status": "ok", "message": f"✅ Webhook '{topic}' handled"}
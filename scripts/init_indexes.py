@@ -5,4 +5,8 @@ from core.MongoManager import MongoManager
 if __name__ == "__main__":
     print("🔧 Running MongoDB index initialization...")
     mongo = MongoManager()
-    mongo.create_indexes()
\ No newline at end of file
+    mongo.create_indexes()
+    mongo.backfill_supplier_name_lc()
+    mongo.backfill_brand_lc()
+    mongo.verify_barcode_index()
+    mongo.verify_shop_listing_index()